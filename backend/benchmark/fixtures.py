@@ -0,0 +1,101 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+import chromadb
+from sqlalchemy import create_engine
+
+
+SOURCE_CSV = os.path.join(os.path.dirname(__file__), "..", "test", "float_5907082.csv")
+BASE_FLOAT_ID = 5907082
+EMBEDDING_DIM = 16
+
+# Regions the fixture floats are spread over, with the longitude shift that puts a
+# copy of the Bay of Bengal source float into that sea
+REGIONS = [("BAY OF BENGAL", 0.0), ("ARABIAN SEA", -18.0), ("LACCADIVE SEA", -9.0)]
+
+COLUMNS = {
+    "Profile": "profile",
+    "Date": "date",
+    "Latitude": "latitude",
+    "Longitude": "longitude",
+    "Pres_raw(dbar)": "pres_raw_dbar",
+    "Pres_adj(dbar)": "pres_adj_dbar",
+    "Temp_raw(C)": "temp_raw_c",
+    "Temp_adj(C)": "temp_adj_c",
+    "Psal_raw(psu)": "psal_raw_psu",
+    "Psal_adj(psu)": "psal_adj_psu",
+}
+
+
+def fixture_frame(floats=12, source=SOURCE_CSV, seed=0):
+    """
+    argo_data_clean rows for `floats` floats: copies of the sample float in test/,
+    moved between regions and with a little noise so aggregates differ per float.
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(source)[list(COLUMNS)].rename(columns=COLUMNS)
+    base["date"] = pd.to_datetime(base["date"])
+
+    frames = []
+    for i in range(floats):
+        df = base.copy()
+        _, lon_shift = REGIONS[i % len(REGIONS)]
+        df["float_id"] = BASE_FLOAT_ID + i
+        df["longitude"] += lon_shift
+        df["latitude"] += rng.normal(0, 0.5)
+        for col in ("temp_raw_c", "temp_adj_c"):
+            df[col] += rng.normal(0, 0.3, len(df))
+        for col in ("psal_raw_psu", "psal_adj_psu"):
+            df[col] += rng.normal(0, 0.02, len(df))
+        frames.append(df)
+
+    out = pd.concat(frames, ignore_index=True)
+    out["unique_id"] = np.arange(1, len(out) + 1)
+    return out
+
+
+def load_db_fixture(db_url, frame):
+    """(Re)create argo_data_clean from the fixture frame, on SQLite or a scratch Postgres."""
+    engine = create_engine(db_url)
+    frame.to_sql("argo_data_clean", engine, if_exists="replace", index=False, chunksize=10000)
+    engine.dispose()
+
+
+def fake_embedding(text):
+    """Deterministic unit vector for a text, shared by the Chroma fixture and the replayed embedder."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).normal(size=EMBEDDING_DIM)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def load_chroma_fixture(path, frame):
+    """One document per float in a local PersistentClient, with the metadata flags the filters use."""
+    client = chromadb.PersistentClient(path)
+    try:
+        client.delete_collection("documents")
+    except Exception:
+        pass
+    collection = client.get_or_create_collection(name="documents")
+
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for i, (float_id, df) in enumerate(frame.groupby("float_id")):
+        region, _ = REGIONS[i % len(REGIONS)]
+        summary = f"Float {float_id} profiled the {region.title()} with {df['profile'].nunique()} profiles."
+        ids.append(str(float_id))
+        documents.append(summary)
+        embeddings.append(fake_embedding(summary))
+        metadatas.append({
+            "FLOAT_ID": str(float_id),
+            "DOMINANT_REGION": region.title(),
+            f"VISITED {region}": True,
+            "VISITED INDIAN OCEAN": True,
+            "HAS TEMP": True,
+            "HAS PSAL": True,
+            "HAS PRES": True,
+            "CENTROID_LAT": float(df["latitude"].mean()),
+            "CENTROID_LON": float(df["longitude"].mean()),
+        })
+
+    collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+    return len(ids)
@@ -0,0 +1,111 @@
+import re
+import json
+import time
+import random
+import importlib
+from types import SimpleNamespace
+from benchmark.fixtures import fake_embedding
+
+
+class Recordings:
+    """Recorded LLM outputs per question, looked up by raw query or by enhanced query."""
+
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.latency = data.get("latency_seconds", {})
+        self.questions = data["questions"]
+        self.by_query = {q["query"]: q for q in self.questions}
+        self.by_enhanced = {q["enhanced_query"]: q for q in self.questions}
+
+    def enhanced(self, enhanced_query):
+        try:
+            return self.by_enhanced[enhanced_query]
+        except KeyError:
+            raise KeyError(f"no recording for enhanced query {enhanced_query!r}") from None
+
+
+# router stage -> the recordings.json latency entry it replays
+STAGE_LATENCY = {
+    "enhance": "query_enhancer",
+    "classify": "query_classifier",
+    "filters": "generate_filters",
+    "generate_sql": "sql_generator",
+    "final_answer": "get_ans_with_relevant_data",
+    "embedding": "generate_embeddings",
+}
+
+# Modules that imported the router calls by name; their bindings are the ones replaced
+CHAT_MODULES = [
+    "query_enhancement.enhance", "query_enhancement.classify", "query_enhancement.filters",
+    "generate_sql.sql", "final_ans.final_llm_call", "chat_history.history_store",
+]
+
+
+def _response(content):
+    """Just enough of an OpenAI ChatCompletion for the callers (choices[0].message.content, usage)."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def _user_text(messages):
+    return messages[-1]["content"]
+
+
+def install(recordings, latency_scale=1.0, jitter=0.25):
+    """
+    Replace the Gemini client calls (router chat_completion / stream_chat_completion /
+    embed_content) with replays of `recordings`. Everything above them - local intent
+    replies, the routing and filter fast paths, retries, prompt building - runs as in
+    production. Each replay sleeps for its recorded latency (times latency_scale, +/- jitter)
+    so the pipeline's concurrency and pooling behave as they would against Gemini.
+    """
+    import store_in_vector_db.vector_db as vector_db
+
+    def wait(stage):
+        base = recordings.latency.get(STAGE_LATENCY.get(stage, ""), 0.0) * latency_scale
+        if base > 0:
+            time.sleep(base * random.uniform(1 - jitter, 1 + jitter))
+
+    def reply(stage, messages):
+        text = _user_text(messages)
+        if stage == "enhance":
+            # user message is "LANGUAGE: ...\nCURRENT_TIME_INDIA: ...\n\n<query>"
+            q = recordings.by_query.get(text.split("\n\n", 1)[-1])
+            if q is None:
+                return json.dumps({"reply": "No recording for this question."})
+            return json.dumps({"enhanced_query": q["enhanced_query"]})
+        if stage == "classify":
+            return json.dumps({"search_type": recordings.enhanced(text)["search_type"]})
+        if stage == "filters":
+            return json.dumps({"where": recordings.enhanced(text).get("where") or {}})
+        if stage == "generate_sql":
+            q = recordings.enhanced(text)
+            section = messages[0]["content"].split("Relevant float_ids from vector DB:", 1)[-1].split("Rules for generating SQL", 1)[0]
+            ids = ", ".join(re.findall(r"\d+", section)) or "NULL"
+            return json.dumps({"sql": q["sql"].replace("{float_ids}", ids), "sources_to_cite": ["Argo GDAC (benchmark fixture)"]})
+        if stage == "final_answer":
+            return recordings.enhanced(text.rsplit("User query:\n", 1)[-1].strip())["answer"]
+        if stage == "history_summary":
+            return "Earlier turns asked about ARGO float measurements."
+        raise KeyError(f"no replay for stage {stage!r}")
+
+    def chat_completion(preferred_key=None, stage=None, **kwargs):
+        wait(stage)
+        return _response(reply(stage, kwargs["messages"]))
+
+    def stream_chat_completion(preferred_key=None, stage=None, **kwargs):
+        wait(stage)
+        for word in reply(stage, kwargs["messages"]).split(" "):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))], usage=None)
+
+    def embed_content(preferred_key=None, contents=None, **kwargs):
+        wait("embedding")
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=fake_embedding(contents))])
+
+    for name in CHAT_MODULES:
+        module = importlib.import_module(name)
+        if hasattr(module, "chat_completion"):
+            module.chat_completion = chat_completion
+        if hasattr(module, "stream_chat_completion"):
+            module.stream_chat_completion = stream_chat_completion
+    vector_db.embed_content = embed_content
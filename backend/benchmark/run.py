@@ -0,0 +1,136 @@
+"""
+Offline load test of /query against recorded LLM responses and local data stores.
+
+    cd backend && python -m benchmark.run --requests 100 --concurrency 8
+
+Builds a SQLite argo_data_clean fixture (or loads one into --db-url) and a local Chroma
+PersistentClient under --workdir, replays benchmark/recordings.json in place of the Gemini
+client calls (so the local routing/filter fast paths run as in production), then reports
+p50/p95/p99 latency and throughput per tab.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark /query offline with recorded LLM responses.")
+    parser.add_argument("--tabs", default="theory,table,plot", help="comma separated tabs, each measured separately")
+    parser.add_argument("--requests", type=int, default=60, help="requests per tab")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--floats", type=int, default=12, help="floats in the fixture")
+    parser.add_argument("--synthetic", action="store_true", help="fixture rows from benchmark.synthetic instead of copies of the sample float")
+    parser.add_argument("--recordings", default=os.path.join(HERE, "recordings.json"))
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier on recorded LLM latency, 0 for none")
+    parser.add_argument("--db-url", help="scratch Postgres to load the fixture into (default: SQLite in --workdir)")
+    parser.add_argument("--workdir", default=os.path.join(HERE, ".work"))
+    parser.add_argument("--memo", action="store_true", help="keep the stage memo on (default off, every request runs cold)")
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args()
+
+
+def prepare_environment(args):
+    """Point the backend at the fixtures; must run before any backend module is imported."""
+    os.makedirs(args.workdir, exist_ok=True)
+    os.environ["DB_URL"] = args.db_url or f"sqlite:///{os.path.join(args.workdir, 'argo.db')}"
+    os.environ["CHROMA_PATH"] = os.path.join(args.workdir, "chroma")
+    os.environ["HISTORY_DB_PATH"] = os.path.join(args.workdir, "history.db")
+    os.environ["JOB_DB_PATH"] = os.path.join(args.workdir, "jobs.db")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4), "mean": round(float(np.mean(samples)), 4)}
+
+
+def run_tab_load(app, tab, questions, requests, concurrency):
+    """Fire `requests` /query calls for one tab, `concurrency` at a time."""
+    from fastapi.testclient import TestClient
+
+    local = threading.local()
+
+    def call(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = TestClient(app)
+        body = {"tab": tab, "query": questions[i % len(questions)], "language": "english"}
+        start = time.perf_counter()
+        status = client.post("/query", json=body).status_code
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    wall = time.perf_counter() - start
+
+    ok = [elapsed for elapsed, status in results if status == 200]
+    return {
+        "tab": tab,
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(ok),
+        "errors": requests - len(ok),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "latency_seconds": percentiles(ok),
+    }
+
+
+def main():
+    args = parse_args()
+    os.chdir(BACKEND)
+    sys.path.insert(0, BACKEND)
+    prepare_environment(args)
+
+    from benchmark.fixtures import fixture_frame, load_db_fixture, load_chroma_fixture
+    from benchmark.replay import Recordings, install
+    from benchmark.synthetic import generate
+
+    if args.synthetic:
+        frame = pd.concat([clean for _, clean in generate(None, args.floats, 150, 100)], ignore_index=True)
+    else:
+        frame = fixture_frame(args.floats)
+    load_db_fixture(os.environ["DB_URL"], frame)
+    docs = load_chroma_fixture(os.environ["CHROMA_PATH"], frame)
+    print(f"fixture: {len(frame)} rows, {docs} floats in Chroma", file=sys.stderr)
+
+    import main as api
+    import pipeline.engine as engine
+
+    recordings = Recordings(args.recordings)
+    install(recordings, args.latency_scale)
+    if not args.memo:
+        engine.MEMO_ENABLED = False
+
+    questions = [q["query"] for q in recordings.questions]
+    report = [
+        run_tab_load(api.app, tab.strip(), questions, args.requests, args.concurrency)
+        for tab in args.tabs.split(",") if tab.strip()
+    ]
+
+    print(f"{'tab':<8}{'ok':>6}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for r in report:
+        lat = r["latency_seconds"]
+        print(f"{r['tab']:<8}{r['ok']:>6}{r['errors']:>6}{r['throughput_rps'] or 0:>9.2f}"
+              f"{lat['p50'] or 0:>9.3f}{lat['p95'] or 0:>9.3f}{lat['p99'] or 0:>9.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
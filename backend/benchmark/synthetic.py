@@ -0,0 +1,211 @@
+"""
+Synthetic ARGO floats for scale testing.
+
+    cd backend && python -m benchmark.synthetic --floats 40 --scale 100 --out synthetic_argo
+
+Writes argo_data/-style folders (<id>/<id>_prof.nc, <id>_prof.csv, <id>_meta.nc) that
+vector_db_pipeline.py and the ingestion scripts read unchanged, plus argo_data_clean.csv
+with the rows the SQL path queries. Trajectories drift between the centroids of real IHO
+seas (read from the shapefile's .dbf), so region tagging sees real sea names.
+"""
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import xarray as xr
+from query_enhancement.vocabulary import read_iho_records
+from ingestion.netcdf import prof_to_frame
+
+
+# Seas floats are launched in and drift towards
+DEFAULT_SEAS = [
+    "Bay of Bengal", "Arabian Sea", "Laccadive Sea", "Andaman or Burma Sea",
+    "Indian Ocean", "Mozambique Channel",
+]
+FIRST_FLOAT_ID = 9000001      # outside the WMO ranges real INCOIS floats use
+CYCLE_DAYS = 10
+JULD_EPOCH = "days since 1950-01-01 00:00:00"
+PARAMETERS = [("PRES", "decibar"), ("TEMP", "degree_Celsius"), ("PSAL", "psu")]
+
+CLEAN_COLUMNS = [
+    "profile", "date", "latitude", "longitude", "pres_raw_dbar", "pres_adj_dbar",
+    "temp_raw_c", "temp_adj_c", "psal_raw_psu", "psal_adj_psu", "float_id", "unique_id",
+]
+
+
+def sea_centroids(names=DEFAULT_SEAS):
+    records = {r["NAME"]: r for r in read_iho_records()}
+    return {n: (records[n]["Latitude"], records[n]["Longitude"]) for n in names if n in records}
+
+
+def trajectory(rng, start, end, n_prof):
+    """Drift from one sea's centroid towards another's, with eddy noise on every cycle."""
+    t = np.linspace(0, 1, n_prof)[:, None]
+    path = (1 - t) * np.array(start) + t * np.array(end)
+    noise = np.cumsum(rng.normal(0, 0.15, (n_prof, 2)), axis=0)
+    lat = np.clip(path[:, 0] + noise[:, 0], -60, 30)
+    lon = np.clip(path[:, 1] + noise[:, 1], 20, 147)
+    return lat, lon
+
+
+def pressure_levels(rng, n_prof, n_levels, max_pres=2000.0):
+    """Denser sampling near the surface; deep levels are missing (NaN) on shallow profiles."""
+    base = max_pres * np.linspace(0, 1, n_levels) ** 1.8 + 2.0
+    pres = base[None, :] + rng.normal(0, 0.3, (n_prof, n_levels))
+    reach = rng.uniform(0.6, 1.0, n_prof) * max_pres
+    pres[pres > reach[:, None]] = np.nan
+    return pres
+
+
+def water_column(rng, lat, pres):
+    """Temperature/salinity shaped like the tropical Indian Ocean: warm mixed layer, thermocline, halocline."""
+    surface = 29.5 - 0.25 * np.abs(lat)[:, None] + rng.normal(0, 0.4, (len(lat), 1))
+    mld = rng.uniform(20, 80, (len(lat), 1))
+    temp = np.where(pres < mld, surface, 2.5 + (surface - 2.5) * np.exp(-(pres - mld) / 450.0))
+    temp = temp + rng.normal(0, 0.05, pres.shape)
+
+    fresh = np.where(lat[:, None] > 8, 1.2, 0.3)   # river runoff freshens the northern bay
+    psal = 34.9 - fresh * np.exp(-pres / 120.0) + 0.1 * np.tanh((pres - 600) / 300.0)
+    psal = psal + rng.normal(0, 0.01, pres.shape)
+    return np.where(np.isnan(pres), np.nan, temp), np.where(np.isnan(pres), np.nan, psal)
+
+
+def qc_flags(values):
+    return np.where(np.isnan(values), b" ", b"1").astype("S1")
+
+
+def profile_dataset(rng, float_id, n_prof, n_levels, seas, launch):
+    names = list(seas)
+    start, end = rng.choice(len(names), 2, replace=len(names) < 2)
+    lat, lon = trajectory(rng, seas[names[start]], seas[names[end]], n_prof)
+    juld = np.array([launch + timedelta(days=CYCLE_DAYS * i, hours=float(rng.uniform(0, 6))) for i in range(n_prof)], dtype="datetime64[ns]")
+
+    pres = pressure_levels(rng, n_prof, n_levels)
+    temp, psal = water_column(rng, lat, pres)
+    # adjusted values differ from raw by a small calibration offset, as in delayed-mode files
+    variables = {
+        "PRES": pres, "PRES_ADJUSTED": pres - 0.1,
+        "TEMP": temp, "TEMP_ADJUSTED": temp - 0.002,
+        "PSAL": psal, "PSAL_ADJUSTED": psal + 0.005,
+    }
+
+    ds = xr.Dataset(
+        {
+            "LATITUDE": ("N_PROF", lat),
+            "LONGITUDE": ("N_PROF", lon),
+            "JULD": ("N_PROF", juld),
+            **{k: (("N_PROF", "N_LEVELS"), v.astype("float32")) for k, v in variables.items()},
+            **{f"{k}_QC": (("N_PROF", "N_LEVELS"), qc_flags(v)) for k, v in variables.items()},
+        },
+        attrs={"PLATFORM_NUMBER": str(float_id), "title": "Synthetic Argo float profile"},
+    )
+    ds["JULD"].encoding["units"] = JULD_EPOCH
+    return ds
+
+
+def meta_dataset(rng, float_id, launch, n_prof, lat, lon):
+    end = launch + timedelta(days=CYCLE_DAYS * n_prof)
+    terminated = rng.random() < 0.4
+
+    def text(value):
+        return np.array(value.encode("utf-8"))
+
+    sensors = ["CTD_PRES", "CTD_TEMP", "CTD_CNDC"]
+    return xr.Dataset({
+        "PLATFORM_NUMBER": text(str(float_id)),
+        "WMO_INST_TYPE": text("846"),
+        "PI_NAME": text(rng.choice(["M Ravichandran", "T V S Udaya Bhaskar", "Synthetic PI"])),
+        "OPERATING_INSTITUTION": text("INCOIS"),
+        "PROJECT_NAME": text("Argo India"),
+        "LAUNCH_DATE": text(launch.strftime("%Y%m%d%H%M%S")),
+        "LAUNCH_LATITUDE": np.array(lat[0]),
+        "LAUNCH_LONGITUDE": np.array(lon[0]),
+        "START_DATE": text(launch.strftime("%Y%m%d%H%M%S")),
+        "START_DATE_QC": text("1"),
+        "END_MISSION_DATE": text(end.strftime("%Y%m%d%H%M%S") if terminated else ""),
+        "END_MISSION_STATUS": text("T" if terminated else " "),
+        "PLATFORM_TYPE": text("ARVOR"),
+        "PLATFORM_MAKER": text("NKE"),
+        "SENSOR": ("N_SENSOR", np.array([s.encode() for s in sensors])),
+        "SENSOR_MAKER": ("N_SENSOR", np.array([b"SBE"] * len(sensors))),
+        "SENSOR_MODEL": ("N_SENSOR", np.array([b"SBE41CP"] * len(sensors))),
+        "SENSOR_SERIAL_NO": ("N_SENSOR", np.array([str(rng.integers(1000, 9999)).encode() for _ in sensors])),
+        "PARAMETER": ("N_PARAM", np.array([p.encode() for p, _ in PARAMETERS])),
+        "PARAMETER_UNITS": ("N_PARAM", np.array([u.encode() for _, u in PARAMETERS])),
+    })
+
+
+def clean_frame(prof, first_unique_id):
+    """argo_data_clean rows for one float."""
+    df = pd.DataFrame({
+        "profile": prof["Profile"],
+        "date": pd.to_datetime(prof["Date"]),
+        "latitude": prof["Latitude"],
+        "longitude": prof["Longitude"],
+        "pres_raw_dbar": prof["Pres_raw(dbar)"],
+        "pres_adj_dbar": prof["Pres_adj(dbar)"],
+        "temp_raw_c": prof["Temp_raw(C)"],
+        "temp_adj_c": prof["Temp_adj(C)"],
+        "psal_raw_psu": prof["Psal_raw(psu)"],
+        "psal_adj_psu": prof["Psal_adj(psu)"],
+        "float_id": prof["Float_ID"].astype("int64"),
+    })
+    df["unique_id"] = np.arange(first_unique_id, first_unique_id + len(df))
+    return df[CLEAN_COLUMNS]
+
+
+def generate(out_dir, floats, profiles, levels, seed=0, write_nc=True, seas=DEFAULT_SEAS):
+    """Write `floats` synthetic floats under out_dir; yields (float_id, argo_data_clean frame) per float."""
+    rng = np.random.default_rng(seed)
+    centroids = sea_centroids(seas)
+    unique_id = 1
+
+    for i in range(floats):
+        float_id = FIRST_FLOAT_ID + i
+        launch = datetime(2015, 1, 1) + timedelta(days=int(rng.integers(0, 9 * 365)))
+        n_prof = max(1, int(rng.integers(profiles // 2, profiles + 1)))
+
+        ds = profile_dataset(rng, float_id, n_prof, levels, centroids, launch)
+        prof = prof_to_frame(ds, float_id)
+
+        if out_dir:
+            folder = os.path.join(out_dir, str(float_id))
+            os.makedirs(folder, exist_ok=True)
+            prof.to_csv(os.path.join(folder, f"{float_id}_prof.csv"), index=False)
+            if write_nc:
+                ds.to_netcdf(os.path.join(folder, f"{float_id}_prof.nc"))
+                meta_dataset(rng, float_id, launch, n_prof, ds["LATITUDE"].values, ds["LONGITUDE"].values) \
+                    .to_netcdf(os.path.join(folder, f"{float_id}_meta.nc"))
+
+        clean = clean_frame(prof, unique_id)
+        unique_id += len(clean)
+        yield float_id, clean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ARGO floats for scale tests.")
+    parser.add_argument("--floats", type=int, default=20, help="floats at 1x")
+    parser.add_argument("--profiles", type=int, default=150, help="max profiles per float")
+    parser.add_argument("--levels", type=int, default=100, help="N_LEVELS per profile")
+    parser.add_argument("--scale", type=int, default=1, help="multiplier on --floats (10, 100, 1000)")
+    parser.add_argument("--out", default="synthetic_argo")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-nc", action="store_true", help="only CSVs and argo_data_clean rows")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    clean_path = os.path.join(args.out, "argo_data_clean.csv")
+    rows, header = 0, True
+    for float_id, clean in generate(args.out, args.floats * args.scale, args.profiles, args.levels, args.seed, not args.no_nc):
+        clean.to_csv(clean_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        rows += len(clean)
+        print(f"{float_id}: {len(clean)} rows", file=sys.stderr)
+
+    print(f"{args.floats * args.scale} floats, {rows} argo_data_clean rows in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from llm_client.router import chat_completion
+from summarize_data.digest import estimate_tokens
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "chat_history.db")
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+# Most recent turns always sent verbatim, older ones get folded into the summary
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+HISTORY_CACHE_SESSIONS = int(os.getenv("HISTORY_CACHE_SESSIONS", "1000"))
+
+
+class HistoryStore:
+    """
+    Conversation history per session: an in-memory LRU of recent sessions, written
+    through to SQLite so history survives restarts. Pass db_path=None for memory only.
+    """
+
+    def __init__(self, db_path=HISTORY_DB_PATH, cache_sessions=HISTORY_CACHE_SESSIONS):
+        self.db_path = db_path
+        self.cache_sessions = cache_sessions
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_id, id);
+                CREATE TABLE IF NOT EXISTS summaries (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    through_id INTEGER NOT NULL
+                );
+            """)
+            self.conn.commit()
+
+    def _load(self, session_id):
+        """Session state from cache or SQLite; caller holds the lock."""
+        state = self.cache.get(session_id)
+        if state is None:
+            state = {"summary": "", "through_id": 0, "turns": []}
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT summary, through_id FROM summaries WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if row:
+                    state["summary"], state["through_id"] = row
+                state["turns"] = [
+                    {"id": i, "question": q, "answer": a}
+                    for i, q, a in self.conn.execute(
+                        "SELECT id, question, answer FROM turns WHERE session_id = ? AND id > ? ORDER BY id",
+                        (session_id, state["through_id"]),
+                    )
+                ]
+            self.cache[session_id] = state
+        self.cache.move_to_end(session_id)
+        while len(self.cache) > self.cache_sessions:
+            self.cache.popitem(last=False)
+        return state
+
+    def get(self, session_id):
+        """{"summary": str, "turns": [{"question", "answer"}, ...]} for a session."""
+        with self.lock:
+            state = self._load(session_id)
+            return {"summary": state["summary"], "turns": list(state["turns"])}
+
+    def append(self, session_id, question, answer):
+        with self.lock:
+            state = self._load(session_id)
+            turn_id = (state["turns"][-1]["id"] if state["turns"] else state["through_id"]) + 1
+            if self.conn is not None:
+                cur = self.conn.execute(
+                    "INSERT INTO turns (session_id, question, answer) VALUES (?, ?, ?)",
+                    (session_id, question, answer),
+                )
+                self.conn.commit()
+                turn_id = cur.lastrowid
+            state["turns"].append({"id": turn_id, "question": question, "answer": answer})
+
+    def set_summary(self, session_id, summary, through_id):
+        """Replace the session summary; turns up to through_id are now covered by it."""
+        with self.lock:
+            state = self._load(session_id)
+            state["summary"] = summary
+            state["through_id"] = through_id
+            state["turns"] = [t for t in state["turns"] if t["id"] > through_id]
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT INTO summaries (session_id, summary, through_id) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, through_id = excluded.through_id",
+                    (session_id, summary, through_id),
+                )
+                self.conn.commit()
+
+
+history_store = HistoryStore()
+
+
+def _history_tokens(summary, turns):
+    return estimate_tokens(summary) + sum(estimate_tokens(t["question"]) + estimate_tokens(t["answer"]) for t in turns)
+
+
+def summarize_turns(summary, turns, token_budget):
+    """Fold older turns into the running summary with one cheap LLM call."""
+    transcript = "\n".join(f"User: {t['question']}\nAssistant: {t['answer']}" for t in turns)
+    response = chat_completion(
+        stage="history_summary",
+        model="gemini-2.5-flash",
+        messages=[
+            {"role": "system", "content": (
+                "Summarize this FloatChat conversation about ARGO float data for use as context in "
+                "later turns. Keep regions, floats, parameters, dates and conclusions the user may "
+                f"refer back to. Plain text, at most {token_budget * 3} characters."
+            )},
+            {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ],
+    )
+    return response.choices[0].message.content.strip()
+
+
+def compact_history(session_id, token_budget=HISTORY_TOKEN_BUDGET, keep_turns=HISTORY_KEEP_TURNS):
+    """
+    History for a session as question/answer pairs, bounded to token_budget.
+    When the stored turns overflow, all but the last keep_turns are summarized and the
+    summary is persisted, so each turn is summarized once rather than resent every request.
+    """
+    if not session_id:
+        return []
+
+    state = history_store.get(session_id)
+    summary, turns = state["summary"], state["turns"]
+
+    if _history_tokens(summary, turns) > token_budget and len(turns) > keep_turns:
+        split = len(turns) - keep_turns
+        old, turns = turns[:split], turns[split:]
+        try:
+            summary = summarize_turns(summary, old, token_budget // 2)
+            history_store.set_summary(session_id, summary, old[-1]["id"])
+        except Exception as e:
+            # keep serving without the old turns rather than failing the request
+            log.warning("history_compaction_failed", session_id=session_id, error=str(e))
+
+    # Still too long (huge answers), drop the oldest verbatim turns
+    while turns and _history_tokens(summary, turns) > token_budget:
+        turns = turns[1:]
+
+    history = []
+    if summary:
+        history.append({"question": "Summarize our conversation so far.", "answer": summary})
+    history += [{"question": t["question"], "answer": t["answer"]} for t in turns]
+    return history
+
+
+def record_turn(session_id, question, answer):
+    if session_id and answer:
+        history_store.append(session_id, question, answer)
@@ -1,34 +1,29 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
 from datetime import datetime
 import pytz
+from llm_client.router import chat_completion, stream_chat_completion
+from resilience.retry import resilient, call_with_retry
+from observability.log import get_logger
 
 
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY4')
-
+log = get_logger(__name__)
 
 india_tz = pytz.timezone("Asia/Kolkata")
-current_time_india = datetime.now(india_tz).strftime("%Y-%m-%d %H:%M:%S")
-
-
-def get_ans_with_relevant_data(query, data, history, sources_to_cite, language="english"):
 
-    print("Data received : ", data, end="\n\n")
 
-    
-    SYSTEM_PROMPT = f"""
+# Static so it is a byte-stable prefix (cacheable); time, language, history and the
+# data change per call and are sent after it, see build_messages
+SYSTEM_PROMPT = """
 You are FloatChat, a highly enthusiastic and knowledgeable oceanography expert. 
 You explain ARGO Oceanographic data clearly, in natural, human-like language.
 
-Current date and time (India): {current_time_india}
-
-STRICTLY ANSWER IN THE LANGUAGE: {language}
+The final user message gives the current date and time in India, the LANGUAGE to
+answer in (STRICTLY ANSWER IN THAT LANGUAGE), the Data and the user query.
 
 Core Principles:
 - The 'Data' you receive is already pre-filtered and fully relevant to the user’s query. 
+  It is either the raw result rows, or for large results a digest of the full result
+  (row_count, column_stats, group_aggregates, a downsampled series and top_rows).
+  Treat digest statistics as describing every row, not just the rows shown.
   Do not question or reject it. Always assume it matches the query context (e.g., 
   region, months, depth, variables).
 - Always attempt to answer the user query by analyzing the Data. 
@@ -51,34 +46,83 @@ Tone & Style:
 - Always human-like, never robotic.
 - Speak like a passionate oceanographer who loves to explain patterns and findings.
 
-Input Provided (this data is already the exact subset for the user query):
-{data}
-
-Conversation History:
-{history}
-
 Output format: 
 "<Generated answer>"
 """
 
-    
-    
-    
-    client = OpenAI(
-        api_key=GEMINI_API_KEY,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
 
+def build_messages(query, data, history, language):
+    current_time_india = datetime.now(india_tz).strftime("%Y-%m-%d %H:%M:%S")
+
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for h in history:
+        if(h.get('question') and h.get('answer')):
+            messages.append({"role": "user", "content": h['question']})
+            messages.append({"role": "assistant", "content": h['answer']})
+
+    messages.append({
+        "role": "user",
+        "content": f"""Current date and time (India): {current_time_india}
+LANGUAGE: {language}
+
+Data (this data is already the exact subset for the user query):
+{data}
+
+User query:
+{query}"""
+    })
+    return messages
 
-    response = client.chat.completions.create(
+
+@resilient("gemini")
+def get_ans_with_relevant_data(query, data, history, sources_to_cite, language="english"):
+
+    log.debug("final_answer_data", chars=len(data), sample=0.1)
+
+    messages = build_messages(query, data, history, language)
+
+    response = chat_completion(
+        preferred_key="GEMINI_API_KEY4",
+        stage="final_answer",
         model="gemini-2.5-flash",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": query
-            }
-        ],
+        messages=messages,
     )
 
     return response.choices[0].message.content
+
+
+def stream_ans_with_relevant_data(query, data, history, sources_to_cite, language="english"):
+    """Same as get_ans_with_relevant_data, but yields the answer text chunk by chunk."""
+
+    log.debug("final_answer_data", chars=len(data), stream=True, sample=0.1)
+
+    messages = build_messages(query, data, history, language)
+
+    first, rest = call_with_retry("gemini", _open_stream, messages)
+    if first is not None:
+        yield first
+    yield from rest
+
+
+def _deltas(stream):
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+def _open_stream(messages):
+    """
+    Start the answer stream and read up to its first text, so a timeout or 429 before any
+    token is retried like the blocking call; once text has been sent an error ends the stream.
+    """
+    deltas = _deltas(stream_chat_completion(
+        preferred_key="GEMINI_API_KEY4",
+        stage="final_answer",
+        model="gemini-2.5-flash",
+        messages=messages,
+        stream_options={"include_usage": True},
+    ))
+    return next(deltas, None), deltas
@@ -1,11 +1,23 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
 import json
+from llm_client.router import chat_completion
+from resilience.retry import resilient
+from observability.log import get_logger
+from ingestion.standard_levels import STANDARD_LEVELS, covers_clean
+from retrieve_data_from_db.postgres_db import engine
 
 
-load_dotenv()
-GEMINI_API_KEY=os.getenv('GEMINI_API_KEY3')
+log = get_logger(__name__)
+
+LEVELS_TEXT = ", ".join(str(level) for level in STANDARD_LEVELS)
+
+# How to pick the table, depending on whether argo_standard_levels covers every float in argo_data_clean yet
+TABLE_CHOICE = {
+    True: """  • Prefer argo_standard_levels for values at a specific depth/pressure that is one of the standard levels ("temperature at 500 dbar", "salinity at 1000 m"), depth slices or maps at a level, sections/transects at fixed levels, and comparing levels across profiles or time. Treat metres as dbar (1 m ≈ 1 dbar) and use the nearest standard level, mentioning it in "sources_to_cite".
+  • Use argo_data_clean for full-resolution vertical profiles, pressures that are not standard levels, pressure ranges, raw vs adjusted values, and anything that needs every measured level.""",
+    False: """  • Use argo_data_clean for every query, including values at a depth: filter "pres_adj_dbar" to a narrow window around it (treat metres as dbar, 1 m ≈ 1 dbar).
+  • argo_standard_levels is still being filled and covers only some floats: use it only when the user explicitly asks for standard-level values, and never to count or compare floats, regions or periods.""",
+}
+
 
 def clean_response(res):
     if isinstance(res, str):
@@ -24,6 +36,7 @@ def clean_response(res):
     
     return cleaned_response
 
+@resilient("gemini")
 def sql_generator(query, type, retrieved_data=None):
     SYSTEM_PROMPT = f"""
 You are an expert PostgreSQL query generator whose primary goal is to provide *accurate and efficient SQL* to answer user queries.
@@ -43,7 +56,26 @@ Table "public.argo_data_clean"
  psal_raw_psu     | double precision             |           |          | 
  psal_adj_psu     | double precision             |           |          | 
  float_id         | bigint                       |           |          | 
- unique_id        | bigint                       |           |          | 
+ unique_id        | bigint                       |           |          | nextval('argo_data_clean_unique_id_seq')
+Partition key: RANGE ("date"), one partition per year.
+Indexes: BRIN ("date"), btree ("float_id", "profile").
+One row per measured level of each profile.
+
+Table "public.argo_standard_levels"
+    Column         | Type                         | Nullable
+------------------+------------------------------+---------
+ float_id         | bigint                       | not null
+ profile          | integer                      | not null
+ date             | timestamp without time zone  |
+ latitude         | double precision             |
+ longitude        | double precision             |
+ max_pres_dbar    | double precision             |
+ temp_<L>         | double precision             |
+ psal_<L>         | double precision             |
+Primary key: ("float_id", "profile").
+One row per profile; temp_<L> / psal_<L> are temperature (°C) and salinity (PSU) linearly
+interpolated to the standard pressure level L dbar, for L in: {LEVELS_TEXT}
+(e.g. "temp_500", "psal_1000"). NULL where the profile does not reach or bracket L.
 
 User request:
 {query}
@@ -53,13 +85,17 @@ Relevant float_ids from vector DB:
 
 Rules for generating SQL:
 - Use only SELECT statements (no INSERT/UPDATE/DELETE/DDL).
-- Table: argo_data_clean (do not quote or pluralize the name).
+- Tables: argo_data_clean and argo_standard_levels (do not quote or pluralize the names).
+- Choosing the table:
+{TABLE_CHOICE[covers_clean(engine)]}
+  • The two tables join on ("float_id", "profile").
 - Always wrap column names in double quotes, exactly as in schema.
 - Always use relevant data type for that particular data you are representing
 - Include "latitude" and "longitude" columns for any profiles being retrieved.
 - For dates:
   • User input is TEXT in YYYY-MM-DD format.
-  • Cast to DATE when filtering, e.g. "date"::DATE BETWEEN '2022-01-01' AND '2022-12-31'.
+  • Filter on the bare "date" column with a half-open range, e.g. "date" >= '2022-01-01' AND "date" < '2023-01-01'.
+  • Never cast or wrap "date" in a function inside WHERE ("date"::DATE, DATE_TRUNC, EXTRACT): the table is partitioned by year on "date" and only a bare comparison lets PostgreSQL skip the other years. Casting and DATE_TRUNC are fine in SELECT and GROUP BY.
 - "float_id" is BIGINT → wrap numeric IDs in single quotes only if treated as TEXT.
 - Always terminate with a semicolon (;).
 - Return output ONLY in valid JSON (see format below), no commentary or extra text.
@@ -81,7 +117,7 @@ Handling data volume:
 Optimization & Accuracy:
 - Only select columns necessary to answer the user query.
 - Ensure numeric data types are aggregated correctly and NULLs are handled appropriately.
-- Always filter using relevant float_ids and date ranges to minimize output.
+- Always filter using relevant float_ids and date ranges to minimize output; a "float_id" filter uses the btree index and a "date" range skips whole yearly partitions.
 - Avoid sending excessive rows to the LLM; summarize whenever possible.
 
 Return Format (JSON only):
@@ -95,24 +131,22 @@ Return Format (JSON only):
 """
 
 
-    try:
-        client = OpenAI(
-            api_key=GEMINI_API_KEY,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
-
-        response = client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {
-                    "role": "user",
-                    "content": query
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
+    # API errors propagate so the stage retry / circuit breaker can handle them
+    response = chat_completion(
+        preferred_key="GEMINI_API_KEY3",
+        stage="generate_sql",
+        model="gemini-2.5-flash",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": query
+            }
+        ],
+        response_format={"type": "json_object"}
+    )
 
+    try:
         content = response.choices[0].message.content
         parsed = json.loads(content)
         
@@ -123,5 +157,5 @@ Return Format (JSON only):
         return parsed
     
     except Exception as e:
-        print(f"Error in sql_generator: {e}")
+        log.error("sql_response_unparsed", error=str(e))
         return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,397 @@
+"""
+Bulk load converted profiles into Postgres with COPY FROM STDIN.
+
+    cd backend && python -m ingestion.copy_loader argo_data/*/*_prof.nc --table argo_data_clean
+
+Columns go from prof_to_frame straight into a temp staging table over COPY (CSV
+format, chunked in memory, no file on disk), then one set-based INSERT ... SELECT moves
+them into the target table.
+
+The default "replace" mode makes re-ingesting a float idempotent: every staged profile
+gets an md5 of its rows, and only profiles whose hash differs from the one recorded in
+ingest_profile_hash are deleted and re-inserted, in the same transaction as the COPY.
+Profiles that vanished from a float's file are deleted too. A delayed-mode update
+rewrites the profiles it touched and leaves the rest of the float alone. Every load also
+records the float in ingest_state (same transaction), which is what lets the orchestrator
+skip a float whose files came back 304.
+
+When argo_data_clean is partitioned (ingestion/partitions.py), the yearly partitions a
+batch needs are created before the insert; its unique_id comes from a sequence default
+the loader adds on first use. argo_standard_levels (ingestion/standard_levels.py)
+is one more target: one row per profile, interpolated onto standard pressure levels.
+"""
+import io
+import os
+import re
+import time
+import argparse
+from dotenv import load_dotenv
+import pandas as pd
+from sqlalchemy import create_engine
+from ingestion.netcdf import prof_to_frame
+from ingestion.partitions import PARTITIONED, is_partitioned, ensure_year_partitions
+from ingestion import standard_levels
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+DB_URL = os.getenv("DB_URL")
+# Rows serialized per COPY chunk, bounds memory on very large floats
+COPY_CHUNK_ROWS = int(os.getenv("COPY_CHUNK_ROWS", "100000"))
+MODES = ("replace", "append")
+
+
+def profile_data_rows(prof):
+    """profileData columns, adjusted values falling back to raw ones (same rules as load_csv_to_postgres_db)."""
+    def qc(col):
+        return pd.to_numeric(prof[col], errors="coerce")
+
+    return pd.DataFrame({
+        "float_id": prof["Float_ID"].astype("int64"),
+        "profile": prof["Profile"].astype("int64"),
+        "obs_time": pd.to_datetime(prof["Date"]),
+        "lon": prof["Longitude"],
+        "lat": prof["Latitude"],
+        "pres": prof["Pres_adj(dbar)"].fillna(prof["Pres_raw(dbar)"]),
+        "temp": prof["Temp_adj(C)"].fillna(prof["Temp_raw(C)"]),
+        "psal": prof["Psal_adj(psu)"].fillna(prof["Psal_raw(psu)"]),
+        "qc_pres": qc("Pres_adj_qc").fillna(qc("Pres_raw_qc")).astype("Int16"),
+        "qc_temp": qc("Temp_adj_qc").fillna(qc("Temp_raw_qc")).astype("Int16"),
+        "qc_psal": qc("Psal_adj_qc").fillna(qc("Psal_raw_qc")).astype("Int16"),
+    })
+
+
+def clean_rows(prof):
+    """argo_data_clean columns."""
+    return pd.DataFrame({
+        "profile": prof["Profile"].astype("int64"),
+        "date": pd.to_datetime(prof["Date"]),
+        "latitude": prof["Latitude"],
+        "longitude": prof["Longitude"],
+        "pres_raw_dbar": prof["Pres_raw(dbar)"],
+        "pres_adj_dbar": prof["Pres_adj(dbar)"],
+        "temp_raw_c": prof["Temp_raw(C)"],
+        "temp_adj_c": prof["Temp_adj(C)"],
+        "psal_raw_psu": prof["Psal_raw(psu)"],
+        "psal_adj_psu": prof["Psal_adj(psu)"],
+        "float_id": prof["Float_ID"].astype("int64"),
+    })
+
+
+# target table -> (rows builder, staging DDL, INSERT ... SELECT from the staging table)
+TARGETS = {
+    "profileData": (
+        profile_data_rows,
+        """CREATE TEMP TABLE profile_staging (
+            float_id bigint, profile integer, obs_time timestamp, lon double precision, lat double precision,
+            pres double precision, temp double precision, psal double precision,
+            qc_pres smallint, qc_temp smallint, qc_psal smallint
+        ) ON COMMIT DROP""",
+        """INSERT INTO profileData (float_id, profile, obs_time, geom, pres, temp, psal, qc_pres, qc_temp, qc_psal)
+        SELECT float_id, profile, obs_time, ST_SetSRID(ST_MakePoint(lon, lat), 4326), pres, temp, psal, qc_pres, qc_temp, qc_psal
+        FROM profile_staging""",
+    ),
+    "argo_data_clean": (
+        clean_rows,
+        """CREATE TEMP TABLE clean_staging (
+            profile integer, date timestamp, latitude double precision, longitude double precision,
+            pres_raw_dbar double precision, pres_adj_dbar double precision,
+            temp_raw_c double precision, temp_adj_c double precision,
+            psal_raw_psu double precision, psal_adj_psu double precision, float_id bigint
+        ) ON COMMIT DROP""",
+        """INSERT INTO argo_data_clean (profile, date, latitude, longitude, pres_raw_dbar, pres_adj_dbar,
+            temp_raw_c, temp_adj_c, psal_raw_psu, psal_adj_psu, float_id)
+        SELECT profile, date, latitude, longitude, pres_raw_dbar, pres_adj_dbar,
+            temp_raw_c, temp_adj_c, psal_raw_psu, psal_adj_psu, float_id
+        FROM clean_staging""",
+    ),
+    standard_levels.TABLE: (
+        standard_levels.standard_level_rows,
+        standard_levels.STAGING_DDL,
+        standard_levels.INSERT_SQL,
+    ),
+}
+
+# targets the loader creates on first use; the others are managed outside this module
+TABLE_DDL = {standard_levels.TABLE: standard_levels.TABLE_DDL}
+
+# target -> surrogate key column the INSERT leaves out, filled from <table>_<column>_seq
+ID_COLUMNS = {"argo_data_clean": "unique_id"}
+
+
+def staging_name(ddl):
+    return re.search(r"CREATE TEMP TABLE (\w+)", ddl).group(1)
+
+
+HASH_DDL = """CREATE TABLE IF NOT EXISTS ingest_profile_hash (
+    target text NOT NULL,
+    float_id bigint NOT NULL,
+    profile integer NOT NULL,
+    hash text NOT NULL,
+    loaded_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (target, float_id, profile)
+)"""
+
+# Floats whose current files finished loading into each target (a table, or the Chroma
+# index); a 304 from the DAC only means "nothing to do" when the float is recorded here
+STATE_DDL = """CREATE TABLE IF NOT EXISTS ingest_state (
+    target text NOT NULL,
+    float_id bigint NOT NULL,
+    loaded_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (target, float_id)
+)"""
+RECORD_STATE_SQL = """INSERT INTO ingest_state (target, float_id)
+    SELECT %(target)s, float_id FROM (SELECT DISTINCT float_id FROM {staging}) f
+    ON CONFLICT (target, float_id) DO UPDATE SET loaded_at = now()"""
+
+# Statements of one replace-mode swap; {staging} is the COPY target, {table} the real table
+REPLACE_SQL = [
+    # one loader per float at a time, so two runs of the same float cannot interleave their swaps
+    "SELECT pg_advisory_xact_lock(float_id) FROM (SELECT DISTINCT float_id FROM {staging} ORDER BY float_id) f",
+    """CREATE TEMP TABLE staged_hashes ON COMMIT DROP AS
+        SELECT float_id, profile, md5(string_agg(s::text, '|' ORDER BY s::text)) AS hash
+        FROM {staging} s GROUP BY float_id, profile""",
+    """CREATE TEMP TABLE changed_profiles ON COMMIT DROP AS
+        SELECT h.float_id, h.profile, h.hash FROM staged_hashes h
+        LEFT JOIN ingest_profile_hash o
+            ON o.target = %(target)s AND o.float_id = h.float_id AND o.profile = h.profile
+        WHERE o.hash IS DISTINCT FROM h.hash""",
+]
+DELETE_GONE_SQL = """DELETE FROM {table} t
+    WHERE t.float_id IN (SELECT DISTINCT float_id FROM staged_hashes)
+    AND NOT EXISTS (SELECT 1 FROM staged_hashes h WHERE h.float_id = t.float_id AND h.profile = t.profile)"""
+DELETE_CHANGED_SQL = """DELETE FROM {table} t USING changed_profiles c
+    WHERE t.float_id = c.float_id AND t.profile = c.profile"""
+CHANGED_ONLY = " WHERE (float_id, profile) IN (SELECT float_id, profile FROM changed_profiles)"
+RECORD_HASH_SQL = [
+    """DELETE FROM ingest_profile_hash o
+        WHERE o.target = %(target)s AND o.float_id IN (SELECT DISTINCT float_id FROM staged_hashes)
+        AND NOT EXISTS (SELECT 1 FROM staged_hashes h WHERE h.float_id = o.float_id AND h.profile = o.profile)""",
+    """INSERT INTO ingest_profile_hash (target, float_id, profile, hash)
+        SELECT %(target)s, float_id, profile, hash FROM changed_profiles
+        ON CONFLICT (target, float_id, profile) DO UPDATE SET hash = EXCLUDED.hash, loaded_at = now()""",
+    "DROP TABLE staged_hashes, changed_profiles",
+]
+
+_prepared = set()
+
+
+def ensure_id_default(cursor, table, column):
+    """
+    Give `column` a nextval() default so rows COPYed without it still get a unique id.
+    The sequence starts after the ids already in the table (bulk loads from CSV carry them).
+    """
+    seq = f"{table.lower()}_{column}_seq"
+    cursor.execute(
+        "SELECT column_default FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+        (table.lower(), column),
+    )
+    row = cursor.fetchone()
+    if row is None or row[0] is not None:
+        return
+    # two loaders adding the default at once would both seed the sequence; serialize per table
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"id_default:{table.lower()}",))
+    cursor.execute("SELECT to_regclass(%s) IS NULL", (seq,))
+    if cursor.fetchone()[0]:
+        cursor.execute(f"CREATE SEQUENCE {seq}")
+        cursor.execute(f"SELECT setval('{seq}', COALESCE((SELECT max({column}) FROM {table}), 0) + 1, false)")
+    cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT nextval('{seq}')")
+    log.info("id_default_added", table=table, column=column, sequence=seq)
+
+
+def prepare(cursor, table, mode):
+    """
+    Create the target if this module owns it, the ingest_state table, and the id default
+    of targets with a surrogate key; in replace mode also the hash bookkeeping table and the
+    (float_id, profile) index the swap deletes by. Once per process: returns the key the
+    caller adds to _prepared after its transaction commits (None if already prepared).
+    """
+    if (table, mode) in _prepared:
+        return None
+    cursor.execute(STATE_DDL)
+    if table in TABLE_DDL:
+        cursor.execute(TABLE_DDL[table])      # keyed by (float_id, profile) already
+    if table in ID_COLUMNS:
+        ensure_id_default(cursor, table, ID_COLUMNS[table])
+    if mode == "replace":
+        cursor.execute(HASH_DDL)
+        if table not in TABLE_DDL:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table.lower()}_float_profile_idx ON {table} (float_id, profile)")
+    return table, mode
+
+
+def replace_profiles(cursor, table, staging, insert):
+    """Swap the staged profiles into `table` where their content changed. Returns (profiles, deleted, inserted)."""
+    params = {"target": table}
+    for sql in REPLACE_SQL:
+        cursor.execute(sql.format(staging=staging), params)
+    cursor.execute("SELECT count(*) FROM changed_profiles")
+    changed = cursor.fetchone()[0]
+
+    cursor.execute(DELETE_GONE_SQL.format(table=table))
+    deleted = cursor.rowcount
+    cursor.execute(DELETE_CHANGED_SQL.format(table=table))
+    deleted += cursor.rowcount
+    cursor.execute(insert + CHANGED_ONLY)
+    inserted = cursor.rowcount
+
+    for sql in RECORD_HASH_SQL:
+        cursor.execute(sql, params)
+    return changed, deleted, inserted
+
+
+def copy_rows(cursor, table, rows, chunk_rows=COPY_CHUNK_ROWS):
+    """COPY a DataFrame into `table`, chunk by chunk through an in-memory CSV buffer."""
+    columns = ", ".join(rows.columns)
+    for start in range(0, len(rows), chunk_rows):
+        buffer = io.StringIO()
+        rows.iloc[start:start + chunk_rows].to_csv(buffer, header=False, index=False, na_rep="", date_format="%Y-%m-%d %H:%M:%S")
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+
+
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DB_URL, pool_pre_ping=True)
+    return _engine
+
+
+def load_frame(prof, tables=("profileData",), engine=None, mode="replace"):
+    """
+    Load a prof_to_frame DataFrame (needs Float_ID) into each target table in one
+    transaction. mode="replace" swaps in only the profiles whose content changed,
+    mode="append" inserts every row (first bulk load into empty tables).
+    Returns {"rows", "seconds", "rows_per_second"} per table, plus
+    {"changed_profiles", "deleted", "inserted"} in replace mode.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+    engine = engine or get_engine()
+    stats = {}
+    prepared = []
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            for table in tables:
+                build, ddl, insert = TARGETS[table]
+                start = time.perf_counter()
+                rows = build(prof)
+                cursor.execute(ddl)
+                copy_rows(cursor, staging_name(ddl), rows)
+                prepared.append(prepare(cursor, table, mode))
+                if table in PARTITIONED and is_partitioned(cursor, table):
+                    ensure_year_partitions(cursor, table, staging_name(ddl))
+                if mode == "replace":
+                    changed, deleted, inserted = replace_profiles(cursor, table, staging_name(ddl), insert)
+                    extra = {"changed_profiles": changed, "deleted": deleted, "inserted": inserted}
+                else:
+                    cursor.execute(insert)
+                    extra = {}
+                cursor.execute(RECORD_STATE_SQL.format(staging=staging_name(ddl)), {"target": table})
+                seconds = time.perf_counter() - start
+                stats[table] = {"rows": len(rows), "seconds": round(seconds, 3), "rows_per_second": round(len(rows) / seconds) if seconds else None, **extra}
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    # only now is the DDL durable; a rolled-back load prepares again next time
+    _prepared.update(p for p in prepared if p is not None)
+
+    for table, s in stats.items():
+        log.info("copy_loaded", table=table, **s)
+    return stats
+
+
+def record_loaded(float_id, targets, engine=None):
+    """Mark `targets` that are not tables (e.g. "chroma") as holding float_id's current files."""
+    engine = engine or get_engine()
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(STATE_DDL)
+            for target in targets:
+                cursor.execute(
+                    """INSERT INTO ingest_state (target, float_id) VALUES (%s, %s)
+                    ON CONFLICT (target, float_id) DO UPDATE SET loaded_at = now()""",
+                    (target, int(float_id)),
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def forget_loaded(float_id, engine=None):
+    """Drop float_id's ingest_state rows once new files arrive, so each target has to record it again."""
+    engine = engine or get_engine()
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('ingest_state') IS NOT NULL")
+            if cursor.fetchone()[0]:
+                cursor.execute("DELETE FROM ingest_state WHERE float_id = %s", (int(float_id),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def is_loaded(float_id, targets, engine=None):
+    """Whether every one of `targets` recorded a finished load of float_id."""
+    targets = list(targets)
+    if not targets:
+        return True
+    engine = engine or get_engine()
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('ingest_state') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return False
+            cursor.execute(
+                "SELECT count(*) FROM ingest_state WHERE float_id = %s AND target = ANY(%s)",
+                (int(float_id), targets),
+            )
+            return cursor.fetchone()[0] == len(set(targets))
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def load_netcdf(nc_path, float_id=None, tables=("profileData",), engine=None, mode="replace"):
+    """NetCDF -> columns -> COPY, with no CSV in between. float_id defaults to the file name prefix."""
+    float_id = float_id or os.path.basename(nc_path).split("_")[0]
+    return load_frame(prof_to_frame(nc_path, int(float_id)), tables, engine, mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY _prof.nc files into Postgres.")
+    parser.add_argument("paths", nargs="+", help="_prof.nc files")
+    parser.add_argument("--table", action="append", choices=list(TARGETS), help="target table, repeatable (default profileData)")
+    parser.add_argument("--mode", choices=MODES, default="replace", help="replace changed profiles (default) or append every row")
+    args = parser.parse_args()
+
+    tables = tuple(args.table or ["profileData"])
+    total_rows, start = 0, time.perf_counter()
+    for path in args.paths:
+        stats = load_netcdf(path, tables=tables, mode=args.mode)
+        total_rows += sum(s["rows"] for s in stats.values())
+    seconds = time.perf_counter() - start
+    print(f"{total_rows} rows from {len(args.paths)} files in {seconds:.1f}s ({total_rows / seconds:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Parallel, resumable downloads of float files from an Argo DAC.
+
+    cd backend && python -m ingestion.downloader --min-float 5907192 --workers 8
+
+One keep-alive requests.Session is shared by a bounded thread pool. Each file streams
+into <name>.part and is renamed into place when complete; an interrupted .part is resumed
+with a Range request, and downloaded again from scratch if the server answers 416. The ETag/Last-Modified of every finished file are kept next to it
+(<name>.validators.json) and sent back as If-None-Match/If-Modified-Since, so unchanged
+files cost one 304. The base URL is a parameter, so any local HTTP server can stand in.
+"""
+import os
+import json
+import argparse
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+DAC_BASE_URL = os.getenv("DAC_BASE_URL", "https://data-argo.ifremer.fr/dac/incois/")
+DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "argo_data")
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "60"))
+CHUNK_BYTES = 1 << 20
+
+
+class LinkParser(HTMLParser):
+    """hrefs of an Apache/nginx directory index."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+
+def wanted_file(name):
+    """meta.nc and prof.nc, not the Sprof/BRprof variants (same rule automated_pipeline.py used)."""
+    lower = name.lower()
+    return lower.endswith("_meta.nc") or (lower.endswith("_prof.nc") and "sprof" not in lower and "brprof" not in lower)
+
+
+@dataclass
+class DownloadResult:
+    float_id: str
+    name: str
+    path: str
+    status: str          # "downloaded", "resumed", "not_modified" or "failed"
+    bytes: int = 0
+    error: Optional[str] = None
+
+
+def make_session(workers=DOWNLOAD_WORKERS):
+    """Keep-alive session with a connection per worker and retries on flaky gateways."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class DacDownloader:
+    def __init__(self, base_url=DAC_BASE_URL, dest=DOWNLOAD_DIR, workers=DOWNLOAD_WORKERS, session=None):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.dest = dest
+        self.workers = workers
+        self.session = session or make_session(workers)
+
+    def _links(self, url):
+        resp = self.session.get(url, timeout=DOWNLOAD_TIMEOUT)
+        resp.raise_for_status()
+        parser = LinkParser()
+        parser.feed(resp.text)
+        return parser.links
+
+    def list_floats(self, min_float=None):
+        floats = [h.strip("/") for h in self._links(self.base_url) if h.endswith("/") and h[:1].isdigit()]
+        if min_float is not None:
+            floats = [f for f in floats if int(f) >= min_float]
+        return floats
+
+    def list_files(self, float_id):
+        return [h for h in self._links(f"{self.base_url}{float_id}/") if wanted_file(h)]
+
+    @staticmethod
+    def _validators_path(path):
+        return path + ".validators.json"
+
+    def _read_validators(self, path):
+        try:
+            with open(self._validators_path(path), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_validators(self, path, resp):
+        validators = {k: resp.headers[h] for k, h in (("etag", "ETag"), ("last_modified", "Last-Modified")) if h in resp.headers}
+        tmp = self._validators_path(path) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(validators, f)
+        os.replace(tmp, self._validators_path(path))
+
+    def _discard_part(self, part):
+        for p in (part, self._validators_path(part)):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    def fetch(self, float_id, name):
+        """Download one file unless the server says it is unchanged."""
+        url = f"{self.base_url}{float_id}/{name}"
+        folder = os.path.join(self.dest, float_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, name)
+        part = path + ".part"
+
+        headers = {}
+        validators = self._read_validators(path) if os.path.exists(path) else {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        part_validators = self._read_validators(part) if offset else {}
+        if offset and (part_validators.get("etag") or part_validators.get("last_modified")):
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = part_validators.get("etag") or part_validators["last_modified"]
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+                if resp.status_code == 304:
+                    return DownloadResult(float_id, name, path, "not_modified")
+                if resp.status_code == 416 and "Range" in headers:
+                    # the .part already holds the whole file (or more); start it over without Range
+                    resp.close()
+                    self._discard_part(part)
+                    return self.fetch(float_id, name)
+                resp.raise_for_status()
+
+                resumed = resp.status_code == 206
+                if not resumed:
+                    offset = 0
+                self._write_validators(part, resp)
+
+                written = 0
+                with open(part, "ab" if resumed else "wb") as f:
+                    for chunk in resp.iter_content(CHUNK_BYTES):
+                        f.write(chunk)
+                        written += len(chunk)
+
+                os.replace(part, path)
+                os.replace(self._validators_path(part), self._validators_path(path))
+                return DownloadResult(float_id, name, path, "resumed" if resumed else "downloaded", offset + written)
+
+        except Exception as e:
+            # the .part stays on disk and is resumed next run
+            return DownloadResult(float_id, name, path, "failed", error=str(e))
+
+    def download_floats(self, float_ids):
+        """Fetch every wanted file of every float on the worker pool; yields DownloadResults as they finish."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download") as pool:
+            listings = {pool.submit(self.list_files, f): f for f in float_ids}
+            downloads = []
+            for future in as_completed(listings):
+                float_id = listings[future]
+                try:
+                    names = future.result()
+                except Exception as e:
+                    yield DownloadResult(float_id, "", "", "failed", error=f"listing failed: {e}")
+                    continue
+                downloads += [pool.submit(self.fetch, float_id, name) for name in names]
+
+            for future in as_completed(downloads):
+                result = future.result()
+                log.info("download", float_id=result.float_id, file=result.name, status=result.status, bytes=result.bytes, error=result.error)
+                yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download meta.nc/prof.nc files from an Argo DAC.")
+    parser.add_argument("--base-url", default=DAC_BASE_URL)
+    parser.add_argument("--dest", default=DOWNLOAD_DIR)
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument("--min-float", type=int, help="skip float ids below this")
+    parser.add_argument("floats", nargs="*", help="float ids (default: every float in the DAC index)")
+    args = parser.parse_args()
+
+    downloader = DacDownloader(args.base_url, args.dest, args.workers)
+    float_ids = args.floats or downloader.list_floats(args.min_float)
+
+    counts = {}
+    for result in downloader.download_floats(float_ids):
+        counts[result.status] = counts.get(result.status, 0) + 1
+    print(f"{len(float_ids)} floats: {counts}")
+
+
+if __name__ == "__main__":
+    main()
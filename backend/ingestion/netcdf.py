@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+
+# (variable, raw column, adjusted column, raw qc column, adjusted qc column) in _prof.csv
+MEASUREMENTS = [
+    ("PRES", "Pres_raw(dbar)", "Pres_adj(dbar)", "Pres_raw_qc", "Pres_adj_qc"),
+    ("TEMP", "Temp_raw(C)", "Temp_adj(C)", "Temp_raw_qc", "Temp_adj_qc"),
+    ("PSAL", "Psal_raw(psu)", "Psal_adj(psu)", "Psal_raw_qc", "Psal_adj_qc"),
+]
+
+PROF_COLUMNS = ["Profile", "Date", "Latitude", "Longitude"] + [
+    c for _, raw, adj, raw_qc, adj_qc in MEASUREMENTS for c in (raw, adj, raw_qc, adj_qc)
+]
+
+
+def _levels(ds, name, shape):
+    """(N_PROF * N_LEVELS,) values of a 2-D variable, NaN when the file doesn't carry it."""
+    if name not in ds:
+        return np.full(shape[0] * shape[1], np.nan)
+    return ds[name].values.reshape(-1)
+
+
+def _qc(ds, name, shape):
+    if name not in ds:
+        return np.full(shape[0] * shape[1], " ")
+    return ds[name].values.reshape(-1).astype(str)
+
+
+def prof_to_frame(ds, float_id=None, drop_empty_levels=True):
+    """
+    Flatten a _prof.nc dataset (or path) into one row per profile level, in the
+    _prof.csv column layout. Every variable is reshaped once to a flat column;
+    levels where PRES, TEMP and PSAL are all NaN are dropped with a single mask.
+    """
+    if not isinstance(ds, xr.Dataset):
+        with xr.open_dataset(ds) as opened:
+            return prof_to_frame(opened.load(), float_id, drop_empty_levels)
+
+    shape = (ds.sizes["N_PROF"], ds.sizes["N_LEVELS"])
+    n_levels = shape[1]
+
+    columns = {}
+    if float_id is not None:
+        columns["Float_ID"] = np.full(shape[0] * n_levels, float_id)
+    columns["Profile"] = np.repeat(np.arange(1, shape[0] + 1), n_levels)
+    columns["Date"] = np.repeat(ds["JULD"].values, n_levels)
+    columns["Latitude"] = np.repeat(ds["LATITUDE"].values, n_levels)
+    columns["Longitude"] = np.repeat(ds["LONGITUDE"].values, n_levels)
+
+    raw_values = []
+    for var, raw, adj, raw_qc, adj_qc in MEASUREMENTS:
+        columns[raw] = _levels(ds, var, shape)
+        columns[adj] = _levels(ds, f"{var}_ADJUSTED", shape)
+        columns[raw_qc] = _qc(ds, f"{var}_QC", shape)
+        columns[adj_qc] = _qc(ds, f"{var}_ADJUSTED_QC", shape)
+        raw_values.append(columns[raw])
+
+    if drop_empty_levels:
+        keep = ~np.logical_and.reduce([np.isnan(v) for v in raw_values])
+        columns = {k: v[keep] for k, v in columns.items()}
+
+    return pd.DataFrame(columns)
+
+
+def prof_to_arrow(ds, float_id=None, drop_empty_levels=True):
+    """prof_to_frame as a pyarrow Table (pyarrow is only needed for this)."""
+    import pyarrow as pa
+    return pa.Table.from_pandas(prof_to_frame(ds, float_id, drop_empty_levels), preserve_index=False)
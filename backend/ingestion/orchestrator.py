@@ -0,0 +1,325 @@
+"""
+Pipelined ingestion: download, decode, COPY, summarize, embed and index floats concurrently.
+
+    cd backend && python -m ingestion.orchestrator --min-float 5907192 --fetch-workers 8 --embed-workers 4
+    cd backend && python -m ingestion.orchestrator --local synthetic_argo --tables profileData argo_data_clean
+
+Every stage is a pool of threads reading a bounded queue and writing the next one:
+
+    fetch -> decode -> load -> describe -> embed -> upsert
+
+so network (fetch, embed), CPU (decode, describe) and database (load, upsert) work overlap,
+and a slow stage fills its inbox and back-pressures the ones before it instead of piling up
+floats in memory. A float that fails a stage is logged and dropped; the others go on.
+A float whose files all come back 304 is skipped only if ingest_state shows its last run
+reached every table and the index, so a failure is retried on the next run.
+Per-stage counts, busy time and backlog are logged every --report-seconds and exported as
+floatchat_ingest_* and floatchat_stage_seconds{stage="ingest_<stage>"} metrics.
+"""
+import os
+import time
+import queue
+import argparse
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from dotenv import load_dotenv
+import xarray as xr
+from ingestion.netcdf import prof_to_frame
+from ingestion.copy_loader import load_frame, record_loaded, forget_loaded, is_loaded, TARGETS, MODES
+from ingestion.standard_levels import TABLE as STANDARD_LEVELS_TABLE
+from ingestion.downloader import DacDownloader, DAC_BASE_URL, DOWNLOAD_DIR
+from observability.tracing import record_span, INGEST_ITEMS, INGEST_BACKLOG
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+# Floats allowed to wait in front of each stage; bounds memory to a few decoded floats per stage
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+INGEST_REPORT_SECONDS = float(os.getenv("INGEST_REPORT_SECONDS", "10"))
+
+DEFAULT_WORKERS = {
+    "fetch": int(os.getenv("INGEST_FETCH_WORKERS", "8")),
+    "decode": int(os.getenv("INGEST_DECODE_WORKERS", "2")),
+    "load": int(os.getenv("INGEST_LOAD_WORKERS", "2")),
+    "describe": int(os.getenv("INGEST_DESCRIBE_WORKERS", "2")),
+    "embed": int(os.getenv("INGEST_EMBED_WORKERS", "4")),
+    "upsert": int(os.getenv("INGEST_UPSERT_WORKERS", "1")),
+}
+
+# profile rows for PostGIS and for SQL answers, plus their standard-level interpolation;
+# argo_data_clean and argo_standard_levels are loaded together so they cover the same floats
+DEFAULT_TABLES = ("profileData", "argo_data_clean", STANDARD_LEVELS_TABLE)
+
+# ingest_state target recorded once a float's summary is upserted into Chroma
+INDEX_TARGET = "chroma"
+
+_STOP = object()
+
+
+@dataclass
+class FloatJob:
+    float_id: str
+    prof_path: Optional[str] = None
+    meta_path: Optional[str] = None
+    prof: Any = None             # prof_to_frame DataFrame, dropped once summarized
+    meta: Any = None             # loaded meta.nc Dataset, dropped once summarized
+    summary: Optional[str] = None
+    metadata: dict = field(default_factory=dict)
+    embedding: Any = None
+    loaded: dict = field(default_factory=dict)
+
+
+class Stage:
+    """`workers` threads applying func to jobs from inbox; func returns the job to pass on or None to drop it."""
+
+    def __init__(self, name, func, workers, inbox, outbox):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+        self.running = self.workers
+        self.threads = [
+            threading.Thread(target=self._work, name=f"ingest-{name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+
+    def start(self):
+        for t in self.threads:
+            t.start()
+
+    def join(self):
+        for t in self.threads:
+            t.join()
+
+    def _count(self, status, seconds):
+        with self.lock:
+            self.busy_seconds += seconds
+            if status == "ok":
+                self.processed += 1
+            elif status == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+        INGEST_ITEMS.labels(stage=self.name, status=status).inc()
+        record_span(f"ingest_{self.name}", seconds, status="ran" if status != "error" else "error")
+
+    def _work(self):
+        while True:
+            job = self.inbox.get()
+            if job is _STOP:
+                # pass the stop on to sibling workers; the last one out stops the next stage
+                with self.lock:
+                    self.running -= 1
+                    last = self.running == 0
+                if not last:
+                    self.inbox.put(_STOP)
+                elif self.outbox is not None:
+                    self.outbox.put(_STOP)
+                return
+
+            start = time.perf_counter()
+            try:
+                out = self.func(job)
+            except Exception as e:
+                self._count("error", time.perf_counter() - start)
+                log.error("ingest_failed", stage=self.name, float_id=job.float_id, error=str(e))
+                continue
+
+            self._count("ok" if out is not None else "skipped", time.perf_counter() - start)
+            if out is not None and self.outbox is not None:
+                self.outbox.put(out)
+
+    def stats(self, elapsed):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "backlog": self.inbox.qsize(),
+                "busy_seconds": round(self.busy_seconds, 2),
+                # floats per wall-clock second, and how much of the pool's time was spent working
+                "throughput": round(self.processed / elapsed, 3) if elapsed else None,
+                "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else None,
+            }
+
+
+class IngestionPipeline:
+    def __init__(self, downloader=None, local_dir=None, tables=DEFAULT_TABLES, workers=None,
+                 queue_size=INGEST_QUEUE_SIZE, force=False, index=True, load_mode="replace"):
+        self.downloader = downloader
+        self.local_dir = local_dir
+        self.tables = tuple(tables)
+        self.force = force
+        self.index = index
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.queue_size = queue_size
+        self.load_mode = load_mode
+
+    def targets(self):
+        """ingest_state targets a float must have finished to count as ingested."""
+        return self.tables + ((INDEX_TARGET,) if self.index else ())
+
+    # --- stage functions ---
+
+    def fetch(self, job):
+        if self.local_dir:
+            folder = os.path.join(self.local_dir, job.float_id)
+            job.prof_path = os.path.join(folder, f"{job.float_id}_prof.nc")
+            job.meta_path = os.path.join(folder, f"{job.float_id}_meta.nc")
+            if not os.path.exists(job.prof_path):
+                raise FileNotFoundError(job.prof_path)
+            return job
+
+        results = [self.downloader.fetch(job.float_id, name) for name in self.downloader.list_files(job.float_id)]
+        failed = [r for r in results if r.status == "failed"]
+        if failed:
+            raise RuntimeError("; ".join(f"{r.name}: {r.error}" for r in failed))
+
+        for r in results:
+            if r.name.lower().endswith("_meta.nc"):
+                job.meta_path = r.path
+            else:
+                job.prof_path = r.path
+        if job.prof_path is None:
+            raise FileNotFoundError(f"no _prof.nc for float {job.float_id}")
+        # unchanged files are only skipped if their last load (and indexing) finished;
+        # a float that failed downstream last run goes through again
+        if all(r.status == "not_modified" for r in results):
+            if not self.force and is_loaded(job.float_id, self.targets()):
+                return None
+        else:
+            forget_loaded(job.float_id)
+        return job
+
+    def decode(self, job):
+        job.prof = prof_to_frame(job.prof_path, int(job.float_id))
+        if self.index:
+            if not job.meta_path or not os.path.exists(job.meta_path):
+                raise FileNotFoundError(f"no _meta.nc for float {job.float_id}")
+            with xr.open_dataset(job.meta_path) as ds:
+                job.meta = ds.load()
+        return job
+
+    def load(self, job):
+        if self.tables:
+            job.loaded = load_frame(job.prof, self.tables, mode=self.load_mode)
+        return job if self.index else None
+
+    def describe(self, job):
+        from vector_db_pipeline import describe_float
+
+        job.summary, job.metadata = describe_float(job.float_id, job.prof, job.meta)
+        job.prof = job.meta = None
+        return job
+
+    def embed(self, job):
+        from store_in_vector_db.vector_db import generate_embeddings
+
+        job.embedding = generate_embeddings(job.summary)
+        return job
+
+    def upsert(self, job):
+        from store_in_vector_db.vector_db import upsert_documents
+
+        upsert_documents(job.summary, job.metadata, job.embedding, job.float_id)
+        record_loaded(job.float_id, (INDEX_TARGET,))
+        return job
+
+    # --- wiring ---
+
+    def _stages(self):
+        names = ["fetch", "decode", "load"] + (["describe", "embed", "upsert"] if self.index else [])
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in names]
+        return [
+            Stage(name, getattr(self, name), self.workers[name], queues[i], queues[i + 1] if i + 1 < len(names) else None)
+            for i, name in enumerate(names)
+        ]
+
+    def report(self, stages, elapsed):
+        stats = {}
+        for s in stages:
+            stats[s.name] = s.stats(elapsed)
+            INGEST_BACKLOG.labels(stage=s.name).set(stats[s.name]["backlog"])
+        return stats
+
+    def run(self, float_ids, report_seconds=INGEST_REPORT_SECONDS):
+        """Push float_ids through every stage; returns the final per-stage stats."""
+        stages = self._stages()
+        for s in stages:
+            s.start()
+
+        start = time.perf_counter()
+        done = threading.Event()
+
+        def reporter():
+            while not done.wait(report_seconds):
+                log.info("ingest_progress", elapsed=round(time.perf_counter() - start, 1),
+                         stages=self.report(stages, time.perf_counter() - start))
+
+        threading.Thread(target=reporter, name="ingest-report", daemon=True).start()
+
+        # put() blocks when fetch is backed up, so the id list never outruns the pipeline
+        for float_id in float_ids:
+            stages[0].inbox.put(FloatJob(str(float_id)))
+        stages[0].inbox.put(_STOP)
+
+        for s in stages:
+            s.join()
+        done.set()
+
+        elapsed = time.perf_counter() - start
+        stats = self.report(stages, elapsed)
+        log.info("ingest_done", floats=len(float_ids), seconds=round(elapsed, 1), stages=stats)
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download, load and index Argo floats as a pipelined DAG.")
+    parser.add_argument("floats", nargs="*", help="float ids (default: every float in the DAC index or --local dir)")
+    parser.add_argument("--base-url", default=DAC_BASE_URL)
+    parser.add_argument("--dest", default=DOWNLOAD_DIR)
+    parser.add_argument("--local", help="ingest <id>/<id>_prof.nc folders already on disk instead of downloading")
+    parser.add_argument("--min-float", type=int, help="skip float ids below this")
+    parser.add_argument("--tables", nargs="*", default=list(DEFAULT_TABLES), choices=list(TARGETS), help="tables to COPY into (none to skip)")
+    parser.add_argument("--load-mode", choices=MODES, default="replace", help="replace changed profiles (default) or append every row")
+    parser.add_argument("--no-index", action="store_true", help="load Postgres only, skip summary/embedding/Chroma")
+    parser.add_argument("--force", action="store_true", help="re-ingest floats whose files came back 304")
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE)
+    parser.add_argument("--report-seconds", type=float, default=INGEST_REPORT_SECONDS)
+    for name, n in DEFAULT_WORKERS.items():
+        parser.add_argument(f"--{name}-workers", type=int, default=n)
+    args = parser.parse_args()
+
+    workers = {name: getattr(args, f"{name}_workers") for name in DEFAULT_WORKERS}
+    downloader = None
+    if args.local:
+        float_ids = args.floats or sorted(f for f in os.listdir(args.local) if f.isdigit())
+        if args.min_float is not None:
+            float_ids = [f for f in float_ids if int(f) >= args.min_float]
+    else:
+        downloader = DacDownloader(args.base_url, args.dest, workers["fetch"])
+        float_ids = args.floats or downloader.list_floats(args.min_float)
+
+    pipeline = IngestionPipeline(downloader, args.local, args.tables, workers, args.queue_size,
+                                  args.force, not args.no_index, args.load_mode)
+    stats = pipeline.run(float_ids, args.report_seconds)
+
+    print(f"{'stage':<10}{'workers':>8}{'ok':>7}{'skip':>6}{'fail':>6}{'/s':>9}{'util':>7}")
+    for name, s in stats.items():
+        print(f"{name:<10}{s['workers']:>8}{s['processed']:>7}{s['skipped']:>6}{s['failed']:>6}"
+              f"{s['throughput'] or 0:>9.2f}{s['utilization'] or 0:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
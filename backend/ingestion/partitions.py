@@ -0,0 +1,215 @@
+"""
+Yearly range partitioning of argo_data_clean on "date".
+
+    cd backend && python -m ingestion.partitions migrate            # heap -> partitioned, keeps the old table
+    cd backend && python -m ingestion.partitions explain            # check pruning on typical generated queries
+
+Each year lives in argo_data_clean_y<YYYY>; rows without a date go to the default
+partition argo_data_clean_undated, whose CHECK constraint admits nothing else. The
+parent carries a BRIN index on "date" (rows arrive roughly in time order per float, so
+block ranges stay tight) and a btree on ("float_id", "profile"), which serves float_id
+lookups and the replace-mode swap in copy_loader. The COPY loader creates the partitions a batch needs before inserting.
+
+Pruning only happens when "date" is compared bare ("date" >= '2022-01-01'); a cast such
+as "date"::DATE hides the partition key, which is why sql_generator's prompt asks for
+half-open ranges.
+"""
+import sys
+import json
+import argparse
+from observability.log import get_logger
+
+
+log = get_logger(__name__)
+
+# partitioned table -> partition key column
+PARTITIONED = {"argo_data_clean": "date"}
+
+PARTITION_DDL = """CREATE TABLE IF NOT EXISTS {table}_y{year} PARTITION OF {parent}
+    FOR VALUES FROM ('{year}-01-01') TO ('{next_year}-01-01')"""
+DEFAULT_PARTITION_DDL = [
+    "CREATE TABLE IF NOT EXISTS {table}_undated PARTITION OF {parent} DEFAULT",
+    # only undated rows may land here; a dated row with no year partition fails instead of
+    # hiding in the default, and new year partitions don't have to scan it
+    "ALTER TABLE {table}_undated ADD CONSTRAINT {table}_undated_{key}_null CHECK ({key} IS NULL)",
+]
+INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS {table}_{key}_brin ON {table} USING brin ({key})",
+    "CREATE INDEX IF NOT EXISTS {table}_float_profile_idx ON {table} (float_id, profile)",
+]
+
+_partitioned = {}
+
+
+def is_partitioned(cursor, table):
+    """
+    Whether `table` is a declaratively partitioned table. Only a yes is cached per process:
+    a table migrated by another process is picked up on the next batch.
+    """
+    if not _partitioned.get(table):
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+            (table.lower(),),
+        )
+        _partitioned[table] = cursor.fetchone()[0]
+    return _partitioned[table]
+
+
+def _partition_exists(cursor, table, year):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"{table.lower()}_y{year}",))
+    return cursor.fetchone()[0]
+
+
+def ensure_year_partitions(cursor, table, source, key=None):
+    """Create the yearly partitions of `table` that the rows in `source` fall into."""
+    key = key or PARTITIONED[table]
+    cursor.execute(f"SELECT DISTINCT extract(year FROM {key})::int FROM {source} WHERE {key} IS NOT NULL")
+    years = sorted(y for (y,) in cursor.fetchall())
+    # checked every batch rather than cached: a partition created in a transaction that
+    # later rolls back must not be remembered as existing
+    missing = [y for y in years if not _partition_exists(cursor, table, y)]
+    if not missing:
+        return []
+
+    # concurrent loaders would race on CREATE TABLE IF NOT EXISTS; serialize partition creation per table
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"partition:{table.lower()}",))
+    created = []
+    for year in missing:
+        if not _partition_exists(cursor, table, year):
+            cursor.execute(PARTITION_DDL.format(table=table, parent=table, year=year, next_year=year + 1))
+            created.append(year)
+    if created:
+        log.info("partitions_created", table=table, years=created)
+    return created
+
+
+def migrate(engine, table="argo_data_clean", drop_old=False):
+    """
+    Rebuild a plain `table` as a yearly partitioned one in a single transaction. The old
+    heap is kept as <table>_unpartitioned (or dropped with drop_old) so the swap can be
+    undone by renaming back. Writers are blocked while rows are copied; readers are not.
+    """
+    key = PARTITIONED[table]
+    old = f"{table}_unpartitioned"
+    new = f"{table}_partitioned"
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            if is_partitioned(cursor, table):
+                log.info("partition_migrate_skipped", table=table, reason="already partitioned")
+                return False
+
+            cursor.execute(f"LOCK TABLE {table} IN SHARE MODE")
+            cursor.execute(f"CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})")
+            cursor.execute(f"SELECT DISTINCT extract(year FROM {key})::int FROM {table} WHERE {key} IS NOT NULL")
+            years = sorted(y for (y,) in cursor.fetchall())
+
+            # partitions are named after the final table name, they move with the parent on rename
+            for year in years:
+                cursor.execute(PARTITION_DDL.format(table=table, parent=new, year=year, next_year=year + 1))
+            for ddl in DEFAULT_PARTITION_DDL:
+                cursor.execute(ddl.format(table=table, parent=new, key=key))
+
+            cursor.execute(f"INSERT INTO {new} SELECT * FROM {table}")
+            rows = cursor.rowcount
+
+            # index names are schema-wide; move the old table's out of the way first
+            cursor.execute(f"ALTER INDEX IF EXISTS {table}_float_profile_idx RENAME TO {old}_float_profile_idx")
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+            cursor.execute(f"ALTER TABLE {new} RENAME TO {table}")
+            for ddl in INDEX_DDL:
+                cursor.execute(ddl.format(table=table, key=key))
+            if drop_old:
+                cursor.execute(f"DROP TABLE {old}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    _partitioned[table] = True
+    log.info("partition_migrated", table=table, rows=rows, years=years, dropped_old=drop_old)
+    return True
+
+
+# Shapes sql_generator produces, and whether the date filter should prune partitions
+TYPICAL_QUERIES = [
+    ('SELECT AVG("temp_adj_c") FROM argo_data_clean '
+     'WHERE "float_id" = {float_id} AND "date" >= \'{year}-01-01\' AND "date" < \'{next_year}-01-01\';', True),
+    ('SELECT date_trunc(\'month\', "date") AS month, AVG("psal_adj_psu"), AVG("latitude"), AVG("longitude") '
+     'FROM argo_data_clean WHERE "date" >= \'{year}-03-01\' AND "date" < \'{year}-09-01\' GROUP BY 1 ORDER BY 1;', True),
+    ('SELECT "profile", "pres_adj_dbar", "temp_adj_c", "latitude", "longitude" FROM argo_data_clean '
+     'WHERE "float_id" IN ({float_id}) AND "date" BETWEEN \'{year}-01-01\' AND \'{year}-12-31\';', True),
+    # the pre-partitioning prompt style, kept to show why the prompt changed
+    ('SELECT COUNT(*) FROM argo_data_clean WHERE "date"::DATE BETWEEN \'{year}-01-01\' AND \'{year}-12-31\';', False),
+]
+
+
+def scanned_relations(plan):
+    """Relation names scanned anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    names = []
+    if "Relation Name" in plan:
+        names.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        names += scanned_relations(child)
+    return names
+
+
+def explain(engine, table="argo_data_clean"):
+    """EXPLAIN the typical queries; returns one {"sql", "scanned", "partitions", "pruned", "expected"} per query."""
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(%s)", (table.lower(),)
+            )
+            partitions = cursor.fetchone()[0]
+            cursor.execute(f"SELECT float_id, extract(year FROM date)::int FROM {table} WHERE date IS NOT NULL LIMIT 1")
+            sample = cursor.fetchone() or (0, 2020)
+
+            report = []
+            for template, expect_pruning in TYPICAL_QUERIES:
+                sql = template.format(float_id=sample[0], year=sample[1], next_year=sample[1] + 1)
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                scanned = sorted(set(scanned_relations(plan[0]["Plan"])))
+                report.append({
+                    "sql": sql,
+                    "scanned": scanned,
+                    "partitions": partitions,
+                    "pruned": len(scanned) < partitions,
+                    "expected": expect_pruning,
+                })
+        conn.rollback()
+    finally:
+        conn.close()
+    return report
+
+
+def main():
+    from ingestion.copy_loader import get_engine
+
+    parser = argparse.ArgumentParser(description="Partition argo_data_clean by year and check pruning.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="rebuild the table as yearly partitions")
+    m.add_argument("--drop-old", action="store_true", help="drop the unpartitioned copy after the swap")
+    sub.add_parser("explain", help="EXPLAIN typical generated queries and report scanned partitions")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.command == "migrate":
+        migrate(engine, drop_old=args.drop_old)
+        return
+
+    failures = 0
+    for r in explain(engine):
+        ok = r["pruned"] == r["expected"]
+        failures += not ok
+        print(f"{'ok ' if ok else 'BAD'} {len(r['scanned'])}/{r['partitions']} partitions  {r['sql']}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Profiles interpolated onto standard pressure levels: one row per profile.
+
+    cd backend && python -m ingestion.standard_levels backfill      # build it from argo_data_clean
+
+argo_standard_levels has temp_<L>/psal_<L> columns for every level L in STANDARD_LEVELS
+(dbar), linearly interpolated between the two measured levels that bracket L. Nothing is
+extrapolated: a level above the shallowest or below the deepest good measurement, or one
+that falls in a gap wider than max_gap(L), is NULL. Adjusted values are used where present,
+raw ones otherwise, and values flagged bad (QC 3/4) are left out.
+
+"Temperature at 500 dbar" then reads one narrow row per profile instead of every level
+row in a pressure window. The COPY loader fills it like any other target (standard_level_rows).
+Floats loaded into argo_data_clean before this table existed need the backfill; until every
+float there has standard-level rows, sql_generator does not steer depth queries here
+(covers_clean).
+"""
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from observability.log import get_logger
+
+
+log = get_logger(__name__)
+
+TABLE = "argo_standard_levels"
+# How long the argo_data_clean coverage check is trusted before it is run again
+COVERAGE_TTL_SECONDS = float(os.getenv("STANDARD_LEVELS_COVERAGE_TTL_SECONDS", "600"))
+
+# Standard pressure levels (dbar), the usual Argo climatology levels down to the 2000 dbar park/profile depth
+STANDARD_LEVELS = [
+    5, 10, 20, 30, 50, 75, 100, 125, 150, 200, 250, 300, 400, 500,
+    600, 700, 800, 900, 1000, 1200, 1400, 1500, 1750, 2000,
+]
+BAD_QC = (3, 4)
+
+# interpolated variable -> (raw column, adjusted column, raw qc column, adjusted qc column) in _prof.csv
+VARIABLES = {
+    "temp": ("Temp_raw(C)", "Temp_adj(C)", "Temp_raw_qc", "Temp_adj_qc"),
+    "psal": ("Psal_raw(psu)", "Psal_adj(psu)", "Psal_raw_qc", "Psal_adj_qc"),
+}
+PRESSURE = ("Pres_raw(dbar)", "Pres_adj(dbar)", "Pres_raw_qc", "Pres_adj_qc")
+
+LEVEL_COLUMNS = [f"{var}_{level}" for var in VARIABLES for level in STANDARD_LEVELS]
+
+TABLE_DDL = f"""CREATE TABLE IF NOT EXISTS {TABLE} (
+    float_id bigint NOT NULL,
+    profile integer NOT NULL,
+    date timestamp,
+    latitude double precision,
+    longitude double precision,
+    max_pres_dbar double precision,
+    {", ".join(f"{c} double precision" for c in LEVEL_COLUMNS)},
+    PRIMARY KEY (float_id, profile)
+)"""
+STAGING_DDL = f"""CREATE TEMP TABLE standard_levels_staging (
+    float_id bigint, profile integer, date timestamp, latitude double precision, longitude double precision,
+    max_pres_dbar double precision, {", ".join(f"{c} double precision" for c in LEVEL_COLUMNS)}
+) ON COMMIT DROP"""
+_COLUMNS = ", ".join(["float_id", "profile", "date", "latitude", "longitude", "max_pres_dbar"] + LEVEL_COLUMNS)
+INSERT_SQL = f"INSERT INTO {TABLE} ({_COLUMNS}) SELECT {_COLUMNS} FROM standard_levels_staging"
+
+# argo_data_clean columns -> _prof.csv columns, for the backfill
+CLEAN_TO_PROF = {
+    "float_id": "Float_ID", "profile": "Profile", "date": "Date", "latitude": "Latitude", "longitude": "Longitude",
+    "pres_raw_dbar": "Pres_raw(dbar)", "pres_adj_dbar": "Pres_adj(dbar)",
+    "temp_raw_c": "Temp_raw(C)", "temp_adj_c": "Temp_adj(C)",
+    "psal_raw_psu": "Psal_raw(psu)", "psal_adj_psu": "Psal_adj(psu)",
+}
+
+
+def max_gap(levels):
+    """Widest gap between measured levels that may be interpolated across at each level (dbar)."""
+    return np.maximum(25.0, 0.25 * np.asarray(levels, dtype=float))
+
+
+def good_values(prof, raw, adj, raw_qc, adj_qc):
+    """Adjusted values falling back to raw ones, NaN where the QC flag says bad. QC columns are optional."""
+    values = prof[adj].fillna(prof[raw]).to_numpy(dtype=float)
+    if raw_qc in prof or adj_qc in prof:
+        flags = pd.Series(np.nan, index=prof.index)
+        for col in (adj_qc, raw_qc):
+            if col in prof:
+                flags = flags.fillna(pd.to_numeric(prof[col], errors="coerce"))
+        values = np.where(flags.isin(BAD_QC).to_numpy(), np.nan, values)
+    return values
+
+
+def interpolate(pres, values, levels=STANDARD_LEVELS):
+    """Linear interpolation of one profile onto `levels`, NaN outside the measured range or across wide gaps."""
+    levels = np.asarray(levels, dtype=float)
+    out = np.full(len(levels), np.nan)
+    ok = ~(np.isnan(pres) | np.isnan(values))
+    if not ok.any():
+        return out
+    p, first = np.unique(pres[ok], return_index=True)      # sorted, one value per pressure
+    v = values[ok][first]
+
+    hi = np.searchsorted(p, levels)                         # first measured pressure >= L
+    exact = (hi < len(p)) & (p[np.minimum(hi, len(p) - 1)] == levels)
+    out[exact] = v[hi[exact]]
+
+    inside = ~exact & (hi > 0) & (hi < len(p))
+    lo, up = hi[inside] - 1, hi[inside]
+    gap = p[up] - p[lo]
+    weight = (levels[inside] - p[lo]) / gap
+    interpolated = v[lo] + weight * (v[up] - v[lo])
+    out[inside] = np.where(gap <= max_gap(levels[inside]), interpolated, np.nan)
+    return out
+
+
+def standard_level_rows(prof):
+    """argo_standard_levels rows for a prof_to_frame DataFrame (needs Float_ID)."""
+    pres = good_values(prof, *PRESSURE)
+    values = {var: good_values(prof, *cols) for var, cols in VARIABLES.items()}
+
+    rows = []
+    for (float_id, profile), index in prof.groupby(["Float_ID", "Profile"], sort=True).indices.items():
+        p = pres[index]
+        first = prof.iloc[index[0]]
+        row = {
+            "float_id": int(float_id),
+            "profile": int(profile),
+            "date": pd.to_datetime(first["Date"]),
+            "latitude": first["Latitude"],
+            "longitude": first["Longitude"],
+            "max_pres_dbar": np.nanmax(p) if not np.isnan(p).all() else np.nan,
+        }
+        for var, v in values.items():
+            row.update(zip((f"{var}_{level}" for level in STANDARD_LEVELS), interpolate(p, v[index])))
+        rows.append(row)
+
+    columns = ["float_id", "profile", "date", "latitude", "longitude", "max_pres_dbar"] + LEVEL_COLUMNS
+    return pd.DataFrame(rows, columns=columns)
+
+
+COVERAGE_SQL = f"""SELECT count(*) FROM (SELECT DISTINCT float_id FROM argo_data_clean) c
+    WHERE NOT EXISTS (SELECT 1 FROM {TABLE} s WHERE s.float_id = c.float_id)"""
+
+_coverage = {"checked_at": 0.0, "covered": False}
+
+
+def covers_clean(engine):
+    """
+    Whether every float in argo_data_clean also has rows here, so the two tables can be
+    used interchangeably. Cached for COVERAGE_TTL_SECONDS; False if either table is missing.
+    """
+    if time.time() - _coverage["checked_at"] < COVERAGE_TTL_SECONDS:
+        return _coverage["covered"]
+    try:
+        with engine.connect() as conn:
+            missing = conn.execute(text(COVERAGE_SQL)).scalar()
+        covered = missing == 0
+        if not covered:
+            log.info("standard_levels_incomplete", floats_missing=missing)
+    except Exception as e:
+        log.warning("standard_levels_coverage_failed", error=str(e))
+        covered = False
+    _coverage.update(checked_at=time.time(), covered=covered)
+    return covered
+
+
+def backfill(engine, float_ids=None, mode="replace"):
+    """Build argo_standard_levels from the rows already in argo_data_clean, one float per transaction."""
+    from ingestion.copy_loader import load_frame
+
+    if float_ids is None:
+        float_ids = pd.read_sql("SELECT DISTINCT float_id FROM argo_data_clean ORDER BY float_id", engine)["float_id"].tolist()
+
+    total = 0
+    for float_id in float_ids:
+        clean = pd.read_sql(
+            text(f"SELECT {', '.join(CLEAN_TO_PROF)} FROM argo_data_clean WHERE float_id = :float_id"),
+            engine, params={"float_id": int(float_id)},
+        )
+        stats = load_frame(clean.rename(columns=CLEAN_TO_PROF), (TABLE,), engine, mode)[TABLE]
+        total += stats["rows"]
+        log.info("standard_levels_backfilled", float_id=float_id, profiles=stats["rows"])
+    return total
+
+
+def main():
+    from ingestion.copy_loader import get_engine, MODES
+
+    parser = argparse.ArgumentParser(description="Build argo_standard_levels from argo_data_clean.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("floats", nargs="*", type=int, help="float ids (default: every float in argo_data_clean)")
+    parser.add_argument("--mode", choices=MODES, default="replace")
+    args = parser.parse_args()
+
+    profiles = backfill(get_engine(), args.floats or None, args.mode)
+    print(f"{profiles} profiles in {TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+import pandas as pd
+from pipeline.plan import run_tab, NOT_PROCESSED
+from observability.log import get_logger, new_correlation_id
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+# Worker processes for background exports; each one loads its own pipeline clients
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished jobs older than this are pruned by the job monitor
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+TERMINAL_STATUSES = ("done", "failed")
+
+# Jobs belong to the server process whose pool runs them. Every server process checks in
+# to the owners table; with several uvicorn workers (or a restarted container that reuses
+# the hostname and pid) sharing jobs.db, only jobs whose owner stopped checking in are failed
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+OWNER_HEARTBEAT_SECONDS = float(os.getenv("JOB_OWNER_HEARTBEAT_SECONDS", "10"))
+OWNER_TIMEOUT_SECONDS = float(os.getenv("JOB_OWNER_TIMEOUT_SECONDS", "60"))
+
+
+class JobStore:
+    """
+    Job state in SQLite, shared by the API process and the worker processes
+    (each process opens its own connection).
+    """
+
+    def __init__(self, db_path=JOB_DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                tab TEXT NOT NULL,
+                query TEXT NOT NULL,
+                language TEXT NOT NULL,
+                session_id TEXT,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                message TEXT,
+                csv_url TEXT,
+                rows INTEGER,
+                timings TEXT,
+                error TEXT,
+                owner TEXT
+            );
+            CREATE TABLE IF NOT EXISTS owners (
+                owner TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL
+            );
+        """)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self.conn.commit()
+
+    def create(self, tab, query, language, session_id=None):
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, tab, query, language, session_id, status, created_at, owner) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, tab, query, language, session_id, time.time(), OWNER),
+            )
+            self.conn.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        if "timings" in fields and fields["timings"] is not None:
+            fields["timings"] = json.dumps(fields["timings"])
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self.conn.commit()
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["timings"] = json.loads(job["timings"]) if job["timings"] else None
+        if job["finished_at"] and job["started_at"]:
+            job["run_seconds"] = round(job["finished_at"] - job["started_at"], 3)
+        return job
+
+    def heartbeat(self):
+        """Record that this process (OWNER) is alive and still running its jobs."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO owners (owner, last_seen) VALUES (?, ?) "
+                "ON CONFLICT (owner) DO UPDATE SET last_seen = excluded.last_seen",
+                (OWNER, time.time()),
+            )
+            self.conn.commit()
+
+    def recover(self):
+        """
+        Jobs left queued/running by a server process that stopped checking in will never
+        finish, fail them. Jobs owned by live processes (other uvicorn workers) are left alone.
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'interrupted by a server restart', finished_at = ? "
+                "WHERE status NOT IN ('done', 'failed') AND owner IS NOT ? "
+                "AND NOT EXISTS (SELECT 1 FROM owners o WHERE o.owner = jobs.owner AND o.last_seen >= ?)",
+                (now, OWNER, now - OWNER_TIMEOUT_SECONDS),
+            )
+            if cursor.rowcount:
+                log.warning("jobs_recovered", jobs=cursor.rowcount)
+            self.conn.execute("DELETE FROM owners WHERE last_seen < ?", (now - OWNER_TIMEOUT_SECONDS,))
+            self.conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - JOB_RETENTION_SECONDS,))
+            self.conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Per-process JobStore, opened on first use (worker processes open their own)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+
+_monitor = None
+
+
+def start_monitor():
+    """
+    Once per server process: check in every OWNER_HEARTBEAT_SECONDS and fail the jobs of
+    owners that stopped, so clients polling a job from a dead process get an answer.
+    """
+    global _monitor
+    with _store_lock:
+        if _monitor is not None:
+            return
+        _monitor = threading.Thread(target=_monitor_loop, name="job-monitor", daemon=True)
+        _monitor.start()
+
+
+def _monitor_loop():
+    store = get_job_store()
+    while True:
+        try:
+            store.heartbeat()
+            store.recover()
+        except sqlite3.Error as e:
+            log.warning("job_monitor_failed", error=str(e))
+        time.sleep(OWNER_HEARTBEAT_SECONDS)
+
+
+def run_job(job_id, tab, query, language, history):
+    """Runs in a worker process: answer one tab and record the outcome on the job row."""
+    new_correlation_id(job_id)
+    store = get_job_store()
+    store.update(job_id, status="running", started_at=time.time())
+    try:
+        run, answer = run_tab(tab, query, language, history, artifact_id=f"job_{job_id}")
+        answer = answer or {"text": NOT_PROCESSED}
+        rows = run.values.get(f"{tab}_rows")
+        store.update(
+            job_id,
+            status="done",
+            finished_at=time.time(),
+            message=answer.get("text"),
+            csv_url=answer.get("csv_url"),
+            rows=len(rows) if isinstance(rows, pd.DataFrame) else None,
+            timings={k: round(v, 3) for k, v in run.timings.items()},
+        )
+        return answer.get("text")
+    except Exception as e:
+        log.exception("job_failed", job_id=job_id, error=str(e))
+        store.update(job_id, status="failed", finished_at=time.time(), error=str(e))
+        raise
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The worker pool, started on first job; spawn so workers don't inherit open sockets."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            get_job_store().heartbeat()
+            start_monitor()
+            _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def submit_job(tab, query, language, history=None, session_id=None, on_done=None):
+    """
+    Queue one tab answer on the worker pool and return its job id right away.
+    `on_done(answer_text)` is called in this process when the job succeeds.
+    """
+    pool = get_pool()
+    job_id = get_job_store().create(tab, query, language, session_id)
+    future = pool.submit(run_job, job_id, tab, query, language, history or [])
+
+    def finished(f):
+        if f.exception() is not None:
+            # a worker that died before it could record the failure
+            job = get_job_store().get(job_id)
+            if job and job["status"] not in TERMINAL_STATUSES:
+                get_job_store().update(job_id, status="failed", finished_at=time.time(), error=str(f.exception()))
+        elif on_done is not None:
+            on_done(f.result())
+
+    future.add_done_callback(finished)
+    return job_id
+
+
+def get_job(job_id):
+    start_monitor()
+    return get_job_store().get(job_id)
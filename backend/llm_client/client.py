@@ -0,0 +1,75 @@
+import os
+import threading
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI
+from google import genai
+
+
+load_dotenv()
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+GEMINI_KEY_NAMES = ["GEMINI_API_KEY1", "GEMINI_API_KEY2", "GEMINI_API_KEY3", "GEMINI_API_KEY4"]
+
+# Timeouts and pool size, override in .env
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+
+
+# One keep-alive HTTP/2 pool for every OpenAI-compatible client, so each stage reuses
+# the same TLS connection to generativelanguage.googleapis.com instead of dialing a new one
+http_client = httpx.Client(
+    http2=True,
+    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+    ),
+)
+
+_clients = {}
+_genai_clients = {}
+_lock = threading.Lock()
+
+
+def get_api_key(key_name):
+    api_key = os.getenv(key_name)
+    if not api_key:
+        raise RuntimeError(f"{key_name} is not set")
+    return api_key
+
+
+def get_llm_client(key_name="GEMINI_API_KEY1") -> OpenAI:
+    """Shared OpenAI-compatible Gemini client for one API key, built once per process."""
+    client = _clients.get(key_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(key_name)
+            if client is None:
+                client = OpenAI(
+                    api_key=get_api_key(key_name),
+                    base_url=GEMINI_BASE_URL,
+                    http_client=http_client,
+                    max_retries=LLM_MAX_RETRIES,
+                )
+                _clients[key_name] = client
+    return client
+
+
+def get_genai_client(key_name="GEMINI_API_KEY2") -> genai.Client:
+    """Shared google-genai client (used for embeddings) for one API key."""
+    client = _genai_clients.get(key_name)
+    if client is None:
+        with _lock:
+            client = _genai_clients.get(key_name)
+            if client is None:
+                client = genai.Client(
+                    api_key=get_api_key(key_name),
+                    http_options={"timeout": int(LLM_TIMEOUT * 1000)},
+                )
+                _genai_clients[key_name] = client
+    return client
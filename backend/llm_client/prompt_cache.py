@@ -0,0 +1,93 @@
+import os
+import time
+import hashlib
+import threading
+from dotenv import load_dotenv
+from google.genai import types
+from llm_client.client import get_genai_client
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+# Explicit Gemini context caching for the big static system prompts. Off by default:
+# Gemini 2.5 already discounts repeated prefixes implicitly, explicit caches cost storage.
+GEMINI_EXPLICIT_CACHE = os.getenv("GEMINI_EXPLICIT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+# Gemini refuses explicit caches below this many tokens for 2.5 Flash
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))
+# After a transient failure to create a cache, wait this long before trying that prompt again
+GEMINI_CACHE_RETRY_SECONDS = float(os.getenv("GEMINI_CACHE_RETRY_SECONDS", "300"))
+# Statuses meaning explicit caching is not supported for this prompt/model at all
+UNSUPPORTED_STATUSES = (400, 404)
+
+_caches = {}  # (key_name, model, prompt hash) -> (cache name, expires_at)
+_failed = set()      # entries whose cache can never be created
+_cooldown = {}       # entry -> time before which creating its cache is not retried
+_lock = threading.Lock()
+
+
+def _cache_name(key_name, model, prompt):
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+    entry_key = (key_name, model, digest)
+
+    with _lock:
+        if entry_key in _failed or _cooldown.get(entry_key, 0) > time.time():
+            return None
+        entry = _caches.get(entry_key)
+        # refresh a little before expiry so no request races the TTL
+        if entry and entry[1] - time.time() > 60:
+            return entry[0]
+
+    try:
+        cache = get_genai_client(key_name).caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=prompt,
+                ttl=f"{GEMINI_CACHE_TTL_SECONDS}s",
+                display_name=f"floatchat-{digest}",
+            ),
+        )
+    except Exception as e:
+        # 400/404 (prompt too short for the model, caching unsupported): implicit caching for good;
+        # anything else (quota, network) is retried after a cooldown
+        status = getattr(e, "code", None) or getattr(e, "status_code", None)
+        unsupported = status in UNSUPPORTED_STATUSES
+        log.warning("prompt_cache_unavailable", key=key_name, status=status, permanent=unsupported, error=str(e))
+        with _lock:
+            if unsupported:
+                _failed.add(entry_key)
+            else:
+                _cooldown[entry_key] = time.time() + GEMINI_CACHE_RETRY_SECONDS
+        return None
+
+    with _lock:
+        _cooldown.pop(entry_key, None)
+        _caches[entry_key] = (cache.name, time.time() + GEMINI_CACHE_TTL_SECONDS)
+    return cache.name
+
+
+def with_prompt_cache(key_name, kwargs):
+    """
+    Request kwargs for one key with the leading system message served from an explicit
+    Gemini context cache. Returns kwargs unchanged when caching is off or not possible,
+    in which case the byte-stable prefix still benefits from implicit caching.
+    """
+    messages = kwargs.get("messages") or []
+    if not GEMINI_EXPLICIT_CACHE or not messages or messages[0].get("role") != "system":
+        return kwargs
+
+    prompt = messages[0]["content"]
+    if len(prompt) / 4 < GEMINI_CACHE_MIN_TOKENS:
+        return kwargs
+
+    name = _cache_name(key_name, kwargs["model"], prompt)
+    if name is None:
+        return kwargs
+
+    cached = dict(kwargs)
+    cached["messages"] = messages[1:]
+    cached["extra_body"] = {"extra_body": {"google": {"cached_content": name}}}
+    return cached
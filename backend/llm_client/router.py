@@ -0,0 +1,250 @@
+import os
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+from llm_client.client import GEMINI_KEY_NAMES, get_llm_client, get_genai_client
+from llm_client.prompt_cache import with_prompt_cache
+from observability.tracing import record_tokens
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+# Per-key quota, defaults match the Gemini 2.5 Flash free tier, override in .env
+GEMINI_RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "10"))
+GEMINI_TPM_LIMIT = int(os.getenv("GEMINI_TPM_LIMIT", "250000"))
+# How long a key is benched after a 429 when the response has no Retry-After
+GEMINI_COOLDOWN_SECONDS = float(os.getenv("GEMINI_COOLDOWN_SECONDS", "30"))
+
+WINDOW_SECONDS = 60
+
+
+class KeyStats:
+    """Usage counters for one API key, with a sliding one-minute window for quota."""
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.request_times = deque()
+        self.token_window = deque()  # (timestamp, tokens)
+
+    def trim(self, now):
+        while self.request_times and now - self.request_times[0] > WINDOW_SECONDS:
+            self.request_times.popleft()
+        while self.token_window and now - self.token_window[0][0] > WINDOW_SECONDS:
+            self.token_window.popleft()
+
+    def window_requests(self):
+        return len(self.request_times)
+
+    def window_tokens(self):
+        return sum(tokens for _, tokens in self.token_window)
+
+    def load(self):
+        """Fraction of the per-minute quota in use, plus a little for calls still running."""
+        return max(
+            self.window_requests() / GEMINI_RPM_LIMIT,
+            self.window_tokens() / GEMINI_TPM_LIMIT,
+        ) + 0.01 * self.in_flight
+
+
+class KeyRouter:
+    """Picks the least-loaded healthy Gemini key for each call and tracks per-key quota."""
+
+    def __init__(self, key_names):
+        self.keys = {name: KeyStats(name) for name in key_names if os.getenv(name)}
+        self.lock = threading.Lock()
+
+    def acquire(self, preferred=None, exclude=()):
+        """Reserve a key for one call; prefers `preferred` when loads tie."""
+        with self.lock:
+            now = time.time()
+            candidates = [k for n, k in self.keys.items() if n not in exclude]
+            if not candidates:
+                raise RuntimeError("No Gemini API keys configured (GEMINI_API_KEY1..4)")
+
+            for k in candidates:
+                k.trim(now)
+
+            healthy = [k for k in candidates if k.cooldown_until <= now and k.load() < 1]
+            if not healthy:
+                healthy = [k for k in candidates if k.cooldown_until <= now] or \
+                    [min(candidates, key=lambda k: k.cooldown_until)]
+
+            chosen = min(healthy, key=lambda k: (k.load(), k.name != preferred))
+            chosen.in_flight += 1
+            chosen.requests += 1
+            chosen.request_times.append(now)
+            return chosen.name
+
+    def release(self, name, usage=None):
+        with self.lock:
+            k = self.keys[name]
+            k.in_flight -= 1
+            if usage is not None:
+                prompt = getattr(usage, "prompt_tokens", 0) or 0
+                completion = getattr(usage, "completion_tokens", 0) or 0
+                details = getattr(usage, "prompt_tokens_details", None)
+                k.prompt_tokens += prompt
+                k.completion_tokens += completion
+                k.cached_tokens += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+                k.token_window.append((time.time(), prompt + completion))
+
+    def rate_limited(self, name, retry_after=None):
+        with self.lock:
+            k = self.keys[name]
+            k.in_flight -= 1
+            k.rate_limited += 1
+            k.cooldown_until = time.time() + (retry_after or GEMINI_COOLDOWN_SECONDS)
+
+    def failed(self, name):
+        with self.lock:
+            k = self.keys[name]
+            k.in_flight -= 1
+            k.errors += 1
+
+    def metrics(self):
+        with self.lock:
+            now = time.time()
+            out = {}
+            for name, k in self.keys.items():
+                k.trim(now)
+                out[name] = {
+                    "requests": k.requests,
+                    "prompt_tokens": k.prompt_tokens,
+                    "completion_tokens": k.completion_tokens,
+                    "cached_tokens": k.cached_tokens,
+                    "rate_limited": k.rate_limited,
+                    "errors": k.errors,
+                    "in_flight": k.in_flight,
+                    "requests_last_minute": k.window_requests(),
+                    "tokens_last_minute": k.window_tokens(),
+                    "rpm_limit": GEMINI_RPM_LIMIT,
+                    "tpm_limit": GEMINI_TPM_LIMIT,
+                    "cooling_down_seconds": max(0.0, round(k.cooldown_until - now, 1)),
+                }
+            return out
+
+
+router = KeyRouter(GEMINI_KEY_NAMES)
+
+# Token accounting per pipeline stage (enhance, classify, filters, sql, final_answer, ...)
+stage_usage = {}
+stage_lock = threading.Lock()
+
+
+def record_stage_usage(stage, usage):
+    if stage is None:
+        return
+    with stage_lock:
+        entry = stage_usage.setdefault(stage, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+        })
+        entry["calls"] += 1
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            prompt = getattr(usage, "prompt_tokens", 0) or 0
+            completion = getattr(usage, "completion_tokens", 0) or 0
+            cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+            entry["prompt_tokens"] += prompt
+            entry["completion_tokens"] += completion
+            entry["cached_tokens"] += cached
+            record_tokens(stage, prompt, completion, cached)
+
+
+def stage_token_report():
+    """Per-stage calls and tokens, with the share of prompt tokens served from cache."""
+    with stage_lock:
+        return {
+            stage: {
+                **entry,
+                "avg_prompt_tokens": round(entry["prompt_tokens"] / entry["calls"], 1) if entry["calls"] else 0,
+                "cached_ratio": round(entry["cached_tokens"] / entry["prompt_tokens"], 3) if entry["prompt_tokens"] else 0,
+            }
+            for stage, entry in stage_usage.items()
+        }
+
+
+def is_rate_limit_error(e):
+    """429 from either the OpenAI-compatible endpoint or google-genai."""
+    return getattr(e, "status_code", None) == 429 or getattr(e, "code", None) == 429
+
+
+def retry_after_seconds(e):
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _route(call, preferred_key=None):
+    """Run call(key_name) on the best key, moving to the next key when one returns 429."""
+    tried = set()
+    last_error = None
+    while len(tried) < len(router.keys):
+        key = router.acquire(preferred_key, exclude=tried)
+        try:
+            result = call(key)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                log.warning("key_rate_limited", key=key)
+                router.rate_limited(key, retry_after_seconds(e))
+                tried.add(key)
+                last_error = e
+                continue
+            router.failed(key)
+            raise
+        return key, result
+    raise last_error or RuntimeError("No Gemini API keys configured (GEMINI_API_KEY1..4)")
+
+
+def chat_completion(preferred_key=None, stage=None, **kwargs):
+    """
+    client.chat.completions.create(**kwargs) on the least-loaded healthy key.
+    A leading system message is served from an explicit context cache when enabled.
+    """
+    key, response = _route(
+        lambda k: get_llm_client(k).chat.completions.create(**with_prompt_cache(k, kwargs)), preferred_key
+    )
+    usage = getattr(response, "usage", None)
+    router.release(key, usage)
+    record_stage_usage(stage, usage)
+    return response
+
+
+def stream_chat_completion(preferred_key=None, stage=None, **kwargs):
+    """Streaming chat completion; yields chunks and records usage if the last chunk carries it."""
+    key, stream = _route(
+        lambda k: get_llm_client(k).chat.completions.create(stream=True, **with_prompt_cache(k, kwargs)), preferred_key
+    )
+    usage = None
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            yield chunk
+    finally:
+        router.release(key, usage)
+        record_stage_usage(stage, usage)
+
+
+def embed_content(preferred_key=None, **kwargs):
+    """google-genai models.embed_content(**kwargs) on the least-loaded healthy key."""
+    key, result = _route(lambda k: get_genai_client(k).models.embed_content(**kwargs), preferred_key)
+    router.release(key)
+    return result
+
+
+def key_metrics():
+    return router.metrics()
@@ -1,27 +1,34 @@
 import os 
-import time
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 import pandas as pd
 import json
-import asyncio
-from query_enhancement.enhance import query_enhancer
-from query_enhancement.classify import query_classifier
-from query_enhancement.filters import generate_filters
-from store_in_vector_db.vector_db import query_documents
-from generate_sql.sql import sql_generator
+import time
+import queue
+import threading
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from retrieve_data_from_db.postgres_db import retrieve_data_from_postgres
-from final_ans.final_llm_call import get_ans_with_relevant_data
+from final_ans.final_llm_call import stream_ans_with_relevant_data
+from pipeline.plan import run_tab, run_tabs, TABS, STAGE_EVENTS, NOT_PROCESSED
+from pipeline.batch import run_batch_jsonl, BATCH_CONCURRENCY
+from llm_client.router import key_metrics, stage_token_report
+from resilience.retry import DependencyUnavailable, breaker_states
+from chat_history.history_store import compact_history, record_turn
+from jobs.job_queue import submit_job, get_job, TERMINAL_STATUSES
+from observability.tracing import start_trace, span, REQUEST_SECONDS
+from observability.log import get_logger, new_correlation_id
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
-from typing import Optional
+from typing import Optional, Union
 
 
 load_dotenv()
 
+log = get_logger("main")
+
 app = FastAPI()
 origins = ["http://localhost:5173","http://localhost:8080", "http://127.0.0.1:5173"]
 app.add_middleware(
@@ -31,7 +38,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
-history = [{"question": "hi", "answer": "Hello, I am float chat, here to assist you with oceanographic data, feel free to ask any question related to it."}]
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Per-request correlation id and trace: stage spans go to the Server-Timing header and the request histogram."""
+    request_id = new_correlation_id(request.headers.get("x-request-id"))
+    trace = start_trace()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    response.headers["X-Request-ID"] = request_id
+
+    timing = trace.server_timing()
+    response.headers["Server-Timing"] = f"{timing}, total;dur={elapsed * 1000:.1f}" if timing else f"total;dur={elapsed * 1000:.1f}"
+    response.headers["Timing-Allow-Origin"] = ", ".join(origins)
+
+    # route template, not the raw path, so /jobs/{job_id} is one series
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(endpoint=getattr(route, "path", "other"), status_code=response.status_code).observe(elapsed)
+    log.info("request", method=request.method, path=request.url.path, status_code=response.status_code, ms=round(elapsed * 1000, 1))
+    return response
 
 
 class TableResponse(BaseModel):
@@ -50,331 +77,129 @@ class TextResponse(BaseModel):
     type: str
     message: str
 
+class MultiTabResponse(BaseModel):
+    type: str
+    results: dict[str, Union[TableResponse, PlotResponse, TextResponse]]
+
 class QueryRequest(BaseModel):
     tab: str
     query: str
     language: str
     imageData: Optional[str] = None
-
-def clean_response(res):
+    # several tabs answered from one pipeline run, e.g. ["theory", "table", "plot"]
+    tabs: Optional[list[str]] = None
+    # keys the conversation history, and lets later requests for the same question
+    # (another tab) reuse the shared stages
+    session_id: Optional[str] = None
+    # "job" returns a job id right away and runs the answer on the worker pool
+    mode: Optional[str] = None
+
+def safe_api_call(func, *args, **kwargs):
     """
-    Ensure that the response is always a dict.
-    If it's a string, try to parse as JSON.
-    If parsing fails, wrap it in {'reply': str(res)}.
+    Run one answer pipeline. Retries now happen per stage (see resilience.retry),
+    so a failure here is final and is surfaced as a 503.
     """
-    if isinstance(res, dict):
-        return res
-    if isinstance(res, str):
-        try:
-            return json.loads(res)
-        except json.JSONDecodeError:
-            return {"reply": res}
-    return {"reply": str(res)}
+    try:
+        return func(*args, **kwargs)
+    except DependencyUnavailable as e:
+        log.error("pipeline_failed", func=func.__name__, dependency=e.dependency, error=str(e))
+    except Exception as e:
+        log.exception("pipeline_failed", func=func.__name__, error=str(e))
+    raise HTTPException(
+        status_code=503,
+        detail="External API temporarily unavailable. Please try again later."
+    )
+
+
+def text_answer(query, language, session_id=None):
+    log.info("query", tab="theory", query=query)
+    _, answer = run_tab("theory", query, language, compact_history(session_id), session_id)
+    answer = answer or {"text": NOT_PROCESSED}
+    record_turn(session_id, query, answer['text'])
+    return answer
+
+
+def table_answer(query, language="english", session_id=None):
+    _, answer = run_tab("table", query, language, compact_history(session_id), session_id)
+    answer = answer or {"text": NOT_PROCESSED, "csv_url": None}
+    record_turn(session_id, query, answer['text'])
+    return answer
 
 
-async def save_pg_data_async(pg_data, path):
-    await asyncio.to_thread(pg_data.to_csv, path, index=False)
+def plot_answer(query, language="english", session_id=None):
+    _, answer = run_tab("plot", query, language, compact_history(session_id), session_id)
+    answer = answer or {"text": NOT_PROCESSED, "csv_url": None}
+    record_turn(session_id, query, answer['text'])
+    return answer
 
 
-def safe_api_call(func, *args, retries=3, delay=2, **kwargs):
+def multi_tab_answer(query, language, tabs, session_id=None):
+    """One pipeline run shared by several tabs; only SQL shaping and rendering run per tab."""
+    log.info("query", tabs=tabs, query=query)
+    _, answers = run_tabs(tabs, query, language, compact_history(session_id), session_id)
+    record_turn(session_id, query, "\n\n".join(a['text'] for a in answers.values() if a))
+    return answers
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def text_answer_events(query, language, session_id=None):
     """
-    Wrapper to safely call external APIs with retry logic.
-    Raises HTTPException with 503 if API fails after retries.
+    Streaming version of text_answer for the theory tab.
+    Yields SSE frames: a "stage" event as each pipeline stage finishes, "token" events
+    with the answer text as the final LLM call streams it, then "done" (or "error").
     """
-    for attempt in range(retries):
+    events = queue.Queue()
+    outcome = {}
+    history = compact_history(session_id)
+
+    def on_stage(name, outputs):
+        if name in STAGE_EVENTS:
+            events.put(sse_event("stage", STAGE_EVENTS[name](outputs)))
+
+    def run_until_digest():
         try:
-            return func(*args, **kwargs)
+            outcome["run"], outcome["digest"] = run_tab("theory", query, language, history, session_id, on_stage=on_stage, target="theory_digest")
         except Exception as e:
-            print(f"Attempt {attempt+1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-    raise HTTPException(
-        status_code=503,
-        detail="External API temporarily unavailable. Please try again later."
-    )
+            outcome["error"] = e
+        finally:
+            events.put(None)
 
+    threading.Thread(target=run_until_digest, daemon=True).start()
 
-def text_answer(query, language):
-    res = clean_response(query_enhancer(query, language, []))
-    print("Query:", query)
-    
-    # reply
-    if res.get('reply') is not None:
-        return {"text": res['reply']}
-
-    if res.get('enhanced_query') is not None:
-        enhanced_query = res['enhanced_query']
-        print("Enhanced query:", enhanced_query)
-
-        res = clean_response(query_classifier(enhanced_query))
-
-        if res.get('search_type') is not None:
-            search_type = res['search_type']
-            print("Search type:", search_type)
-
-            # direct SQL
-            if search_type == "sql":
-                res = clean_response(sql_generator(enhanced_query, 'theory'))
-                
-                if res.get('error'):
-                    return {"text": f"Error generating SQL: {res['error']}"}
-                
-                if res.get('sql') is not None:
-                    sql = res['sql']
-                    print("SQL:", sql, end="\n\n")
-
-                    pg_data = retrieve_data_from_postgres(sql)
-                    
-                    if pg_data.empty:
-                        return {"text": "No data found for your query. Please try a different query."}
-                    
-                    pg_data_json = pg_data.to_json(orient="records")
-
-                    sources_to_cite = None
-                    if res.get('sources_to_cite'):
-                        sources_to_cite = res['sources_to_cite']
-                        print("Sources to cite:", sources_to_cite, end="\n\n")
-
-                    final_ans_text = get_ans_with_relevant_data(enhanced_query, pg_data_json, [], sources_to_cite, language)
-                    print("Final ans:", final_ans_text)
-
-                    return {"text": final_ans_text}
-                else:
-                    return {"text": "Could not generate SQL query. Please rephrase your question."}
-                
-            elif search_type == "vector":
-                res = clean_response(generate_filters(enhanced_query))
-                print("Retrieved vector data:", res)
-
-                if res.get('where') is not None:
-                    where_filters = res['where']
-                    res = query_documents(enhanced_query, where_filters)
-                    vector_ids = res['ids'][0]
-
-                    print("Vector IDs:", vector_ids)
-
-                    res = clean_response(sql_generator(enhanced_query, 'theory', vector_ids))
-                    print("SQL response:", res)
-                    
-                    if res.get('error'):
-                        return {"text": f"Error generating SQL: {res['error']}"}
-                    
-                    if res.get('sql') is not None:
-                        sql = res['sql']
-                        print("SQL:", sql)
-
-                        pg_data = retrieve_data_from_postgres(sql)
-                        
-                        if pg_data.empty:
-                            return {"text": "No data found for your query. Please try a different query."}
-                        
-                        pg_data_json = pg_data.to_json(orient="records")
-
-                        sources_to_cite = None
-                        if res.get('sources_to_cite'):
-                            sources_to_cite = res['sources_to_cite']
-                            print("Sources to cite:", sources_to_cite, end="\n\n")
-
-                        final_ans_text = get_ans_with_relevant_data(enhanced_query, pg_data_json, [], sources_to_cite, language)
-                        print("Final ans:", final_ans_text)
-
-                        return {"text": final_ans_text}
-                    else:
-                        return {"text": "Could not generate SQL query. Please rephrase your question."}
-    
-    return {"text": "I couldn't process your query. Please try again."}
-
-
-def table_answer(query, language="english"):
-    res = clean_response(query_enhancer(query, language, []))
-    
-    # reply
-    if res.get('reply') is not None:
-        return {"text": res['reply'], "csv_url": None}
-
-    if res.get('enhanced_query') is not None:
-        enhanced_query = res['enhanced_query']
-        print("Enhanced query:", enhanced_query)
-
-        res = clean_response(query_classifier(enhanced_query))
-
-        if res.get('search_type') is not None:
-            search_type = res['search_type']
-            print("Search type:", search_type)
-
-            # direct SQL
-            if search_type == "sql":
-                res = clean_response(sql_generator(enhanced_query, 'table'))
-                
-                if res.get('error'):
-                    return {"text": f"Error generating SQL: {res['error']}", "csv_url": None}
-                
-                if res.get('sql') is not None:
-                    sql = res['sql']
-                    print("SQL:", sql)
-
-                    pg_data = retrieve_data_from_postgres(sql)
-                    
-                    if pg_data.empty:
-                        return {"text": "No data found for your query.", "csv_url": None}
-                    
-                    if res.get('sources_to_cite'):
-                        sources_to_cite = res['sources_to_cite']
-                        print("Sources to cite:", sources_to_cite, end="\n\n")
-
-                    # Create static/tables directory if it doesn't exist
-                    os.makedirs('static/tables', exist_ok=True)
-                    
-                    csv_path = 'static/tables/userId_chatId_uniqueId.csv'
-                    asyncio.run(save_pg_data_async(pg_data, csv_path))
-
-                    return {
-                        "text": f"Query returned {len(pg_data)} row(s). Showing first {min(len(pg_data), 10)} rows.",
-                        "csv_url": csv_path
-                    }
-                else:
-                    return {"text": "Could not generate SQL query.", "csv_url": None}
-                
-            elif search_type == "vector":
-                res = clean_response(generate_filters(enhanced_query))
-                print("Retrieved vector data:", res)
-
-                if res.get('where') is not None:
-                    where_filters = res['where']
-                    res = query_documents(enhanced_query, where_filters)
-                    vector_ids = res['ids'][0]
-
-                    print("Vector IDs:", vector_ids)
-
-                    res = clean_response(sql_generator(enhanced_query, 'table', vector_ids))
-                    print("SQL response:", res)
-                    
-                    if res.get('error'):
-                        return {"text": f"Error generating SQL: {res['error']}", "csv_url": None}
-                    
-                    if res.get('sql') is not None:
-                        sql = res['sql']
-                        print("SQL:", sql)
-
-                        pg_data = retrieve_data_from_postgres(sql)
-                        
-                        if pg_data.empty:
-                            return {"text": "No data found for your query.", "csv_url": None}
-                        
-                        if res.get('sources_to_cite'):
-                            sources_to_cite = res['sources_to_cite']
-                            print("Sources to cite:", sources_to_cite, end="\n\n")
-
-                        # Create static/tables directory if it doesn't exist
-                        os.makedirs('static/tables', exist_ok=True)
-                        
-                        csv_path = 'static/tables/userId_chatId_uniqueId.csv'
-                        asyncio.run(save_pg_data_async(pg_data, csv_path))
-
-                        return {
-                            "text": f"Query returned {len(pg_data)} row(s). Showing first {min(len(pg_data), 10)} rows.",
-                            "csv_url": csv_path
-                        }
-                    else:
-                        return {"text": "Could not generate SQL query.", "csv_url": None}
-    
-    return {"text": "I couldn't process your query.", "csv_url": None}
-
-
-def plot_answer(query, language="english"):
-    res = clean_response(query_enhancer(query, language, []))
-    
-    # reply
-    if res.get('reply') is not None:
-        return {"text": res['reply'], "csv_url": None}
-
-    if res.get('enhanced_query') is not None:
-        enhanced_query = res['enhanced_query']
-        print("Enhanced query:", enhanced_query)
-
-        res = clean_response(query_classifier(enhanced_query))
-
-        if res.get('search_type') is not None:
-            search_type = res['search_type']
-            print("Search type:", search_type)
-
-            # direct SQL
-            if search_type == "sql":
-                res = clean_response(sql_generator(enhanced_query, 'plot'))
-                
-                if res.get('error'):
-                    return {"text": f"Error generating SQL: {res['error']}", "csv_url": None}
-                
-                if res.get('sql') is not None:
-                    sql = res['sql']
-                    print("SQL:", sql)
-
-                    pg_data = retrieve_data_from_postgres(sql)
-                    
-                    if pg_data.empty:
-                        return {"text": "No data found for your query.", "csv_url": None}
-                    
-                    if res.get('sources_to_cite'):
-                        sources_to_cite = res['sources_to_cite']
-                        print("Sources to cite:", sources_to_cite, end="\n\n")
-
-                    # Create static/plots directory if it doesn't exist
-                    os.makedirs('static/plots', exist_ok=True)
-                    
-                    csv_path = 'static/plots/userId_chatId_uniqueId.csv'
-                    asyncio.run(save_pg_data_async(pg_data, csv_path))
-
-                    return {
-                        "text": f"Query returned {len(pg_data)} row(s). Data prepared for plotting visualization.",
-                        "csv_url": csv_path
-                    }
-                else:
-                    return {"text": "Could not generate SQL query.", "csv_url": None}
-                
-            elif search_type == "vector":
-                res = clean_response(generate_filters(enhanced_query))
-                print("Retrieved vector data:", res)
-
-                if res.get('where') is not None:
-                    where_filters = res['where']
-                    res = query_documents(enhanced_query, where_filters)
-                    vector_ids = res['ids'][0]
-
-                    print("Vector IDs:", vector_ids)
-
-                    res = clean_response(sql_generator(enhanced_query, 'plot', vector_ids))
-                    print("SQL response:", res)
-                    
-                    if res.get('error'):
-                        return {"text": f"Error generating SQL: {res['error']}", "csv_url": None}
-                    
-                    if res.get('sql') is not None:
-                        sql = res['sql']
-                        print("SQL:", sql)
-
-                        pg_data = retrieve_data_from_postgres(sql)
-                        
-                        if pg_data.empty:
-                            return {"text": "No data found for your query.", "csv_url": None}
-                        
-                        if res.get('sources_to_cite'):
-                            sources_to_cite = res['sources_to_cite']
-                            print("Sources to cite:", sources_to_cite, end="\n\n")
-
-                        # Create static/plots directory if it doesn't exist
-                        os.makedirs('static/plots', exist_ok=True)
-                        
-                        csv_path = 'static/plots/userId_chatId_uniqueId.csv'
-                        asyncio.run(save_pg_data_async(pg_data, csv_path))
-
-                        return {
-                            "text": f"Query returned {len(pg_data)} row(s). Data prepared for plotting visualization.",
-                            "csv_url": csv_path
-                        }
-                    else:
-                        return {"text": "Could not generate SQL query.", "csv_url": None}
-    
-    return {"text": "I couldn't process your query.", "csv_url": None}
+    while (event := events.get()) is not None:
+        yield event
+
+    try:
+        if "error" in outcome:
+            raise outcome["error"]
+
+        digest = outcome["digest"]
+        if not isinstance(digest, str):
+            # a stage ended the run early with a reply or an error message
+            text = (digest or {}).get("text", NOT_PROCESSED)
+            record_turn(session_id, query, text)
+            yield sse_event("token", {"text": text})
+            yield sse_event("done", {})
+            return
+
+        run = outcome["run"]
+        sql_response = run.values["theory_sql_response"]
+        answer = []
+        with span("final_answer_stream"):
+            for text in stream_ans_with_relevant_data(run.values["enhanced_query"], digest, history, sql_response.get('sources_to_cite'), language):
+                answer.append(text)
+                yield sse_event("token", {"text": text})
+        record_turn(session_id, query, "".join(answer))
+
+        yield sse_event("done", {"sources_to_cite": sql_response.get('sources_to_cite')})
+
+    except Exception as e:
+        log.exception("stream_failed", error=str(e))
+        yield sse_event("error", {"message": "External API temporarily unavailable. Please try again later."})
 
 
 @app.get("/")
@@ -382,88 +207,196 @@ def main():
     return {"message": "Welcome to Float chat, what do you want to know today... ?"}
 
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus exposition: stage latency/row histograms, token and memo-hit counters."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/metrics/llm-keys")
+def llm_key_metrics():
+    """Per-key request/token usage, 429 counts and cooldowns for the Gemini keys."""
+    return key_metrics()
+
+
+@app.get("/metrics/tokens")
+def token_report():
+    """Calls, prompt/completion tokens and cached-token share per pipeline stage."""
+    return stage_token_report()
+
+
+@app.get("/metrics/breakers")
+def circuit_breaker_states():
+    """Circuit breaker state for Gemini, Chroma and Postgres."""
+    return breaker_states()
+
+
 static_path = Path(__file__).parent / "static"
-print(f"Static path: {static_path}")
+log.info("static_path", path=str(static_path))
 
 app.mount("/static", StaticFiles(directory=static_path), name="static")
 
 
-@app.post("/query")
-def get_answer(req: QueryRequest):
-    global history
+def tab_response(tab_chosen, answer):
+    """Turn a pipeline answer dict into the response model for its tab."""
+    with span("serialization"):
+        return build_tab_response(tab_chosen, answer)
 
-    try:
-        tab_chosen = req.tab.lower() if req.tab and req.tab.lower() in ["table", "plot", "theory"] else "theory"
 
-        # Validate query
-        if not req.query or req.query.strip() == "":
-            raise HTTPException(status_code=400, detail="Query can't be empty")
+def build_tab_response(tab_chosen, answer):
+    if not answer or 'text' not in answer:
+        raise HTTPException(status_code=500, detail=f"Invalid response for {tab_chosen} tab")
 
-        user_query = req.query.strip()
+    text = answer['text']
 
-        # Handle "table" tab
-        if tab_chosen == "table":
-            answer = safe_api_call(table_answer, user_query, req.language)
+    # Handle "theory" or default tab
+    if tab_chosen == "theory":
+        return TextResponse(type=tab_chosen, message=text)
 
-            if not answer or 'text' not in answer:
-                raise HTTPException(status_code=500, detail="Invalid response from table_answer")
+    url = answer.get('csv_url')
 
-            text = answer['text']
-            url = answer.get('csv_url')
+    if not url or not os.path.exists(url):
+        return TextResponse(type=tab_chosen, message=text)
 
-            if not url or not os.path.exists(url):
-                return TextResponse(type=tab_chosen, message=text)
+    # Handle "plot" tab
+    if tab_chosen == "plot":
+        return PlotResponse(
+            type=tab_chosen,
+            message=text,
+            csv_url=url
+        )
 
-            try:
-                df = pd.read_csv(url)
-            except Exception as e:
-                print(f"Error reading CSV: {e}")
-                return TextResponse(type=tab_chosen, message=text)
+    # Handle "table" tab
+    try:
+        df = pd.read_csv(url)
+    except Exception as e:
+        log.error("csv_read_failed", csv_url=url, error=str(e))
+        return TextResponse(type=tab_chosen, message=text)
+
+    return TableResponse(
+        type=tab_chosen,
+        message=text,
+        raw_data=df.head(10).to_dict(orient="records"),
+        columns=df.columns.to_list(),
+        csv_url=url
+    )
 
-            return TableResponse(
-                type=tab_chosen,
-                message=text,
-                raw_data=df.head(10).to_dict(orient="records"),
-                columns=df.columns.to_list(),
-                csv_url=url
-            )
 
-        # Handle "plot" tab
-        elif tab_chosen == "plot":
-            answer = safe_api_call(plot_answer, user_query, req.language)
+@app.post("/query")
+def get_answer(req: QueryRequest):
+    try:
+        tab_chosen = req.tab.lower() if req.tab and req.tab.lower() in TABS else "theory"
 
-            if not answer or 'text' not in answer:
-                raise HTTPException(status_code=500, detail="Invalid response from plot_answer")
+        # Validate query
+        if not req.query or req.query.strip() == "":
+            raise HTTPException(status_code=400, detail="Query can't be empty")
 
-            text = answer['text']
-            url = answer.get('csv_url')
+        user_query = req.query.strip()
 
-            if not url or not os.path.exists(url):
-                return TextResponse(type=tab_chosen, message=text)
+        # Long exports run in the background, the client polls /jobs/{job_id}
+        if req.mode == "job":
+            session_id = req.session_id
+            job_id = submit_job(
+                tab_chosen, user_query, req.language, compact_history(session_id), session_id,
+                on_done=lambda text: record_turn(session_id, user_query, text),
+            )
+            return JSONResponse(
+                status_code=202,
+                content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}", "events_url": f"/jobs/{job_id}/events"}
+            )
 
-            return PlotResponse(
-                type=tab_chosen,
-                message=text,
-                csv_url=url
+        # Several tabs at once share enhancement, classification, vector search
+        if req.tabs:
+            tabs = [t for t in dict.fromkeys(t.lower() for t in req.tabs) if t in TABS] or [tab_chosen]
+            answers = safe_api_call(multi_tab_answer, user_query, req.language, tabs, req.session_id)
+            return MultiTabResponse(
+                type="multi",
+                results={tab: tab_response(tab, answers.get(tab)) for tab in tabs}
             )
 
-        # Handle "theory" or default tab
+        if tab_chosen == "table":
+            answer = safe_api_call(table_answer, user_query, req.language, req.session_id)
+        elif tab_chosen == "plot":
+            answer = safe_api_call(plot_answer, user_query, req.language, req.session_id)
         else:
-            answer = safe_api_call(text_answer, user_query, req.language)
+            answer = safe_api_call(text_answer, user_query, req.language, req.session_id)
 
-            if not answer or 'text' not in answer:
-                raise HTTPException(status_code=500, detail="Invalid response from text_answer")
-
-            text = answer['text']
-
-            return TextResponse(
-                type=tab_chosen,
-                message=text
-            )
+        return tab_response(tab_chosen, answer)
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        print(f"Exception in get_answer: {e}")
+        log.exception("get_answer_failed", error=str(e))
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@app.post("/query/stream")
+def stream_answer(req: QueryRequest):
+    """Theory tab answer streamed as Server-Sent Events (read it with fetch, EventSource can't POST)."""
+    if not req.query or req.query.strip() == "":
+        raise HTTPException(status_code=400, detail="Query can't be empty")
+
+    return StreamingResponse(
+        text_answer_events(req.query.strip(), req.language, req.session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/query/batch")
+async def batch_answer(request: Request, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Body is JSONL, one {tab, query, language} per line. Results stream back as JSONL
+    in completion order, each carrying the "index" of its input line.
+    """
+    body = (await request.body()).decode("utf-8", errors="replace")
+    if not body.strip():
+        raise HTTPException(status_code=400, detail="Batch can't be empty")
+
+    return StreamingResponse(
+        run_batch_jsonl(body.splitlines(), min(max(concurrency, 1), BATCH_CONCURRENCY * 4)),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Status of a background job; once done it carries csv_url, rows and stage timings."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+
+def job_events(job_id):
+    """SSE "status" events whenever the job row changes, until it is done or failed."""
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            # pruned while the stream was open
+            yield sse_event("status", {"id": job_id, "status": "failed", "error": "job no longer exists"})
+            return
+        if job != last:
+            yield sse_event("status", job)
+            last = job
+        if job["status"] in TERMINAL_STATUSES:
+            return
+        time.sleep(JOB_POLL_SECONDS)
+
+
+@app.get("/jobs/{job_id}/events")
+def job_subscribe(job_id: str):
+    if get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(
+        job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import uuid
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" (one object per line) or "text" for local runs
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Longest string kept per field; SQL, answers and payloads past this are cut
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+# Containers longer than this are logged as their size only
+LOG_MAX_ITEMS = int(os.getenv("LOG_MAX_ITEMS", "20"))
+# Records waiting for the writer thread; past this new records are dropped, not blocked on
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+correlation_id: ContextVar = ContextVar("correlation_id", default=None)
+
+
+def new_correlation_id(value=None):
+    """Set the id tying together every log line of one request, job or batch item."""
+    value = value or uuid.uuid4().hex[:16]
+    correlation_id.set(value)
+    return value
+
+
+def compact(value, limit=LOG_MAX_FIELD_CHARS):
+    """
+    A bounded-size, JSON-friendly version of a field value, so a log line costs the
+    same whether the payload is ten rows or a million.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= limit else f"{value[:limit]}...<{len(value) - limit} more chars>"
+    if hasattr(value, "shape") and hasattr(value, "columns"):
+        return f"<DataFrame {value.shape[0]}x{value.shape[1]}>"
+    if isinstance(value, (list, tuple, set)):
+        if len(value) > LOG_MAX_ITEMS:
+            return f"<{type(value).__name__} of {len(value)}>"
+        return [compact(v, limit) for v in value]
+    if isinstance(value, dict):
+        if len(value) > LOG_MAX_ITEMS:
+            return f"<dict of {len(value)}>"
+        return {str(k): compact(v, limit) for k, v in value.items()}
+    return compact(str(value), limit)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = compact(self.formatException(record.exc_info), 4 * LOG_MAX_FIELD_CHARS)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        cid = getattr(record, "correlation_id", None)
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.name} [{cid or '-'}] {record.getMessage()} {fields}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the writer falls behind instead of blocking requests."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record):
+        # fields are already compacted, keep the record as is for the writer thread
+        return record
+
+
+def _configure():
+    root = logging.getLogger("floatchat")
+    if root.handlers:
+        return root
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    # callers only enqueue, formatting and writing happen on the listener thread
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root.addHandler(DroppingQueueHandler(records))
+    listener = logging.handlers.QueueListener(records, stream, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+    return root
+
+
+class StructuredLogger:
+    """
+    log.info("sql_generated", sql=..., rows=...). Fields are compacted before the record
+    is queued; `sample=0.01` keeps roughly 1 in 100 calls for chatty events.
+    """
+
+    def __init__(self, name):
+        self.logger = _configure().getChild(name)
+
+    def _log(self, level, event, sample=None, exc_info=None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample is not None and random.random() >= sample:
+            return
+        self.logger.log(
+            level, event, exc_info=exc_info,
+            extra={"fields": {k: compact(v) for k, v in fields.items()}, "correlation_id": correlation_id.get()},
+        )
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, **fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, exc_info=sys.exc_info(), **fields)
+
+
+def get_logger(name):
+    return StructuredLogger(name)
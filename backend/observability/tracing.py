@@ -0,0 +1,110 @@
+import re
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# Buckets span cache hits (ms) up to slow LLM calls and big exports (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+STAGE_SECONDS = Histogram(
+    "floatchat_stage_seconds", "Time spent in a pipeline stage", ["stage", "status"], buckets=LATENCY_BUCKETS
+)
+STAGE_ROWS = Histogram(
+    "floatchat_stage_rows", "Rows produced by a stage (Postgres fetch, Chroma hits)", ["stage"], buckets=ROW_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "floatchat_request_seconds", "End to end request time", ["endpoint", "status_code"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "floatchat_llm_tokens_total", "Gemini tokens per pipeline stage", ["stage", "kind"]
+)
+MEMO_HITS = Counter(
+    "floatchat_memo_hits_total", "Stages answered from the pipeline memo", ["stage"]
+)
+INGEST_ITEMS = Counter(
+    "floatchat_ingest_items_total", "Floats through an ingestion stage", ["stage", "status"]
+)
+INGEST_BACKLOG = Gauge(
+    "floatchat_ingest_backlog", "Floats waiting in front of an ingestion stage", ["stage"]
+)
+
+
+class Trace:
+    """Spans recorded while serving one request, in the order they finished."""
+
+    def __init__(self):
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds, **attrs):
+        with self.lock:
+            self.spans.append({"name": name, "seconds": seconds, **attrs})
+
+    def server_timing(self):
+        """Server-Timing header value; repeated span names are summed."""
+        totals = {}
+        with self.lock:
+            for s in self.spans:
+                totals[s["name"]] = totals.get(s["name"], 0.0) + s["seconds"]
+        return ", ".join(f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+current_trace: ContextVar = ContextVar("current_trace", default=None)
+
+
+def start_trace():
+    trace = Trace()
+    current_trace.set(trace)
+    return trace
+
+
+def record_span(name, seconds, status="ran", rows=None, **attrs):
+    """Record a finished span on the histograms and on the current request's trace."""
+    STAGE_SECONDS.labels(stage=name, status=status).observe(seconds)
+    if status == "memo":
+        MEMO_HITS.labels(stage=name).inc()
+    if rows is not None:
+        STAGE_ROWS.labels(stage=name).observe(rows)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds, status=status, rows=rows, **attrs)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block. The yielded dict can be filled in while the block runs,
+    e.g. s["rows"] = len(df).
+    """
+    info = dict(attrs)
+    start = time.perf_counter()
+    status = "ran"
+    try:
+        yield info
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        record_span(name, time.perf_counter() - start, info.pop("status", status), **info)
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_tokens(stage, prompt, completion, cached):
+    LLM_TOKENS.labels(stage=stage, kind="prompt").inc(prompt)
+    LLM_TOKENS.labels(stage=stage, kind="completion").inc(completion)
+    LLM_TOKENS.labels(stage=stage, kind="cached").inc(cached)
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import uuid
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+import pandas as pd
+from pipeline.plan import run_tabs, TABS, NOT_PROCESSED
+from observability.log import get_logger, new_correlation_id
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+# Questions answered at once; each one still fans its stages out on the pipeline pool
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+def parse_items(lines):
+    """
+    Parse JSONL lines of {tab, query, language} into (index, item) pairs.
+    Lines that can't be used come back as (index, {"error": ...}).
+    """
+    items = []
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            items.append((index, {"error": f"invalid JSON: {e}"}))
+            continue
+        if not isinstance(item, dict) or not str(item.get("query") or "").strip():
+            items.append((index, {"error": "query can't be empty"}))
+            continue
+        tab = str(item.get("tab") or "theory").lower()
+        items.append((index, {
+            "tab": tab if tab in TABS else "theory",
+            "query": item["query"].strip(),
+            "language": item.get("language") or "english",
+        }))
+    return items
+
+
+def group_items(items):
+    """
+    Items asking the same question (same query and language) are answered by one
+    pipeline run, so enhancement, classification and vector search happen once for all
+    of their tabs. Across groups the stage memo dedupes identical enhanced queries and SQL.
+    """
+    groups = {}
+    for index, item in items:
+        if "error" in item:
+            continue
+        groups.setdefault((item["query"], item["language"]), []).append((index, item["tab"]))
+    return groups
+
+
+def result_record(index, tab, query, language, run, answer):
+    answer = answer or {"text": NOT_PROCESSED}
+    rows = run.values.get(f"{tab}_rows")
+    return {
+        "index": index,
+        "tab": tab,
+        "query": query,
+        "language": language,
+        "status": "ok",
+        "message": answer.get("text"),
+        "csv_url": answer.get("csv_url"),
+        "rows": len(rows) if isinstance(rows, pd.DataFrame) else None,
+        "sql": (run.values.get(f"{tab}_sql_response") or {}).get("sql"),
+        "timings": {k: round(v, 3) for k, v in run.timings.items()},
+        "memo_hits": run.memo_hits,
+    }
+
+
+def answer_group(batch_id, query, language, members):
+    tabs = list(dict.fromkeys(tab for _, tab in members))
+    artifact_id = f"batch_{batch_id}_{members[0][0]}"
+    new_correlation_id(artifact_id)
+    run, answers = run_tabs(tabs, query, language, artifact_id=artifact_id)
+    return [result_record(index, tab, query, language, run, answers.get(tab)) for index, tab in members]
+
+
+def run_batch(lines, concurrency=BATCH_CONCURRENCY):
+    """
+    Answer every {tab, query, language} line, yielding one result dict per line as
+    soon as it is ready (so in completion order; "index" is the input line number).
+    """
+    items = parse_items(lines)[:BATCH_MAX_ITEMS]
+    batch_id = uuid.uuid4().hex[:12]
+
+    for index, item in items:
+        if "error" in item:
+            yield {"index": index, "status": "error", "error": item["error"]}
+
+    groups = group_items(items)
+    log.info("batch_started", batch_id=batch_id, items=len(items), questions=len(groups))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+        futures = {
+            pool.submit(answer_group, batch_id, query, language, members): (query, language, members)
+            for (query, language), members in groups.items()
+        }
+        for future in as_completed(futures):
+            query, language, members = futures[future]
+            try:
+                yield from future.result()
+            except Exception as e:
+                log.error("batch_item_failed", batch_id=batch_id, query=query, error=str(e))
+                for index, tab in members:
+                    yield {"index": index, "tab": tab, "query": query, "language": language, "status": "error", "error": str(e)}
+
+
+def run_batch_jsonl(lines, concurrency=BATCH_CONCURRENCY):
+    """run_batch, serialized as JSONL lines."""
+    for record in run_batch(lines, concurrency):
+        yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of {tab, query, language} through the answer pipeline.")
+    parser.add_argument("input", help="JSONL file of questions, '-' for stdin")
+    parser.add_argument("-o", "--output", help="where to write JSONL results (default stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        # the pipeline's progress prints go to stderr so stdout stays valid JSONL
+        with redirect_stdout(sys.stderr):
+            for line in run_batch_jsonl(source, args.concurrency):
+                sink.write(line)
+                sink.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+# python -m pipeline.batch questions.jsonl -o answers.jsonl
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import os
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from dotenv import load_dotenv
+from observability.tracing import record_span
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
+MEMO_SIZE = int(os.getenv("PIPELINE_MEMO_SIZE", "256"))
+MEMO_TTL_SECONDS = float(os.getenv("PIPELINE_MEMO_TTL_SECONDS", "600"))
+# Off: memoized stages run like any other, no cache lookups and no single-flight waits
+MEMO_ENABLED = os.getenv("PIPELINE_MEMO", "true").lower() in ("1", "true", "yes")
+
+
+class StopPipeline(Exception):
+    """Raised by a stage to end its branch early with a final result (reply, error text, ...)."""
+
+    def __init__(self, result):
+        super().__init__(str(result))
+        self.result = result
+        self.elapsed = 0.0
+
+
+@dataclass
+class Stage:
+    """
+    One node of the plan. `func(**inputs)` must return a dict holding every key in `outputs`.
+    `inputs`/`outputs` map value names to their expected type; `when(**inputs)` returning
+    False skips the stage and sets its outputs to None. `memo_scope()` adds a value to the
+    memo key for stages whose result also depends on something outside their inputs.
+    """
+    name: str
+    func: Callable
+    inputs: dict
+    outputs: dict
+    when: Optional[Callable] = None
+    memoize: bool = False
+    memo_scope: Optional[Callable] = None
+
+
+class MemoCache:
+    """Small thread-safe LRU with a TTL, shared by every plan run in the process."""
+
+    def __init__(self, size=MEMO_SIZE, ttl=MEMO_TTL_SECONDS):
+        self.size = size
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            hit = self.data.get(key)
+            if hit is None:
+                return None
+            stored_at, value = hit
+            if time.time() - stored_at > self.ttl:
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = (time.time(), value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def claim(self, key):
+        """
+        None if the caller should compute `key` itself, otherwise an Event that is set
+        when the run already computing it finishes (single-flight for concurrent runs).
+        """
+        with self.lock:
+            event = self.inflight.get(key)
+            if event is None:
+                self.inflight[key] = threading.Event()
+            return event
+
+    def release(self, key):
+        with self.lock:
+            event = self.inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+memo = MemoCache()
+executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+
+
+def _memo_key(stage, inputs):
+    key = (stage.name,) + tuple((k, repr(inputs[k])) for k in sorted(inputs))
+    if stage.memo_scope is not None:
+        key += (("scope", stage.memo_scope()),)
+    return key
+
+
+def _row_count(outputs):
+    """Length of the first table-like output (DataFrame rows, vector ids), if any."""
+    for value in outputs.values():
+        if hasattr(value, "shape") or isinstance(value, list):
+            return len(value)
+    return None
+
+
+@dataclass
+class PlanRun:
+    """Values produced by one run, plus timings and the stop results that ended branches."""
+    values: dict
+    timings: dict = field(default_factory=dict)
+    memo_hits: list = field(default_factory=list)
+    blocked: dict = field(default_factory=dict)
+
+    def result(self, key):
+        """The value for `key`, or the StopPipeline result that prevented it from being produced."""
+        if key in self.values:
+            return self.values[key]
+        return self.blocked.get(key)
+
+
+class Plan:
+    """A stage graph. Stages whose inputs are ready run concurrently on a shared pool."""
+
+    def __init__(self, stages):
+        self.stages = {s.name: s for s in stages}
+        self.producers = {}
+        for s in stages:
+            for key in s.outputs:
+                if key in self.producers:
+                    raise ValueError(f"{key} is produced by both {self.producers[key]} and {s.name}")
+                self.producers[key] = s.name
+
+    def needed(self, targets):
+        """Names of the stages required to produce `targets`."""
+        needed, todo = set(), list(targets)
+        while todo:
+            producer = self.producers.get(todo.pop())
+            if producer and producer not in needed:
+                needed.add(producer)
+                todo.extend(self.stages[producer].inputs)
+        return needed
+
+    def _run_stage(self, stage, inputs):
+        if stage.when is not None and not stage.when(**inputs):
+            return {k: None for k in stage.outputs}, "skipped"
+
+        if not stage.memoize or not MEMO_ENABLED:
+            return self._call(stage, inputs), "ran"
+
+        key = _memo_key(stage, inputs)
+        while True:
+            cached = memo.get(key)
+            if cached is not None:
+                return cached, "memo"
+            in_flight = memo.claim(key)
+            if in_flight is None:
+                break
+            # another run is computing the same stage with the same inputs, reuse its result
+            in_flight.wait()
+
+        try:
+            outputs = self._call(stage, inputs)
+            memo.put(key, outputs)
+        finally:
+            memo.release(key)
+        return outputs, "ran"
+
+    def _call(self, stage, inputs):
+        outputs = stage.func(**inputs)
+        missing = set(stage.outputs) - set(outputs)
+        if missing:
+            raise TypeError(f"stage {stage.name} did not produce {sorted(missing)}")
+        for k, expected in stage.outputs.items():
+            if outputs[k] is not None and not isinstance(outputs[k], expected):
+                raise TypeError(f"stage {stage.name} produced {k} of type {type(outputs[k]).__name__}, expected {expected.__name__}")
+        return outputs
+
+    def run(self, values, targets, on_stage=None):
+        """
+        Run every stage needed for `targets`, starting from the seed `values`.
+        `on_stage(name, outputs)` is called as each stage finishes.
+        """
+        run = PlanRun(values=dict(values))
+        pending = {n for n in self.needed(targets) if not set(self.stages[n].outputs) <= set(run.values)}
+        running = {}
+
+        while pending or running:
+            for name in list(pending):
+                stage = self.stages[name]
+                blocked = next((k for k in stage.inputs if k in run.blocked), None)
+                if blocked is not None:
+                    # an upstream stage stopped this branch, pass its result along
+                    for k in stage.outputs:
+                        run.blocked[k] = run.blocked[blocked]
+                    pending.discard(name)
+                elif all(k in run.values for k in stage.inputs):
+                    inputs = {k: run.values[k] for k in stage.inputs}
+                    for k, expected in stage.inputs.items():
+                        if inputs[k] is not None and not isinstance(inputs[k], expected):
+                            raise TypeError(f"stage {name} got {k} of type {type(inputs[k]).__name__}, expected {expected.__name__}")
+                    # copy the context so spans recorded inside the stage land on this request's trace
+                    running[executor.submit(contextvars.copy_context().run, self._timed, stage, inputs)] = name
+                    pending.discard(name)
+
+            if not running:
+                if pending:
+                    missing = {k for n in pending for k in self.stages[n].inputs if k not in run.values}
+                    raise ValueError(f"plan cannot make progress, missing inputs {sorted(missing)}")
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage = self.stages[name]
+                try:
+                    outputs, elapsed, status = future.result()
+                except StopPipeline as stop:
+                    for k in stage.outputs:
+                        run.blocked[k] = stop.result
+                    record_span(name, stop.elapsed, "stopped")
+                    continue
+                run.values.update(outputs)
+                if status == "skipped":
+                    continue
+                run.timings[name] = elapsed
+                record_span(name, elapsed, status, rows=_row_count(outputs))
+                if status == "memo":
+                    run.memo_hits.append(name)
+                if on_stage is not None:
+                    on_stage(name, outputs)
+
+        log.info("plan_finished", timings={k: round(v, 3) for k, v in run.timings.items()}, memo_hits=run.memo_hits)
+        return run
+
+    def _timed(self, stage, inputs):
+        start = time.perf_counter()
+        try:
+            outputs, status = self._run_stage(stage, inputs)
+        except StopPipeline as stop:
+            stop.elapsed = time.perf_counter() - start
+            raise
+        return outputs, time.perf_counter() - start, status
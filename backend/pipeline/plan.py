@@ -0,0 +1,248 @@
+import os
+import json
+import asyncio
+import threading
+from collections import OrderedDict
+import pandas as pd
+from query_enhancement.enhance import query_enhancer, time_bucket
+from query_enhancement.classify import query_classifier
+from query_enhancement.filters import generate_filters
+from store_in_vector_db.vector_db import query_documents
+from generate_sql.sql import sql_generator
+from retrieve_data_from_db.postgres_db import retrieve_data_from_postgres
+from final_ans.final_llm_call import get_ans_with_relevant_data
+from summarize_data.digest import summarize_dataframe
+from pipeline.engine import Plan, Stage, StopPipeline
+from observability.log import get_logger
+
+
+log = get_logger(__name__)
+
+
+TABS = ["theory", "table", "plot"]
+
+NOT_PROCESSED = "I couldn't process your query. Please try again."
+NO_DATA = "No data found for your query. Please try a different query."
+NO_SQL = "Could not generate SQL query. Please rephrase your question."
+
+CSV_DIRS = {
+    "table": 'static/tables',
+    "plot": 'static/plots',
+}
+# Interactive requests overwrite one CSV per tab; batch and job runs pass their own id
+DEFAULT_ARTIFACT_ID = "userId_chatId_uniqueId"
+
+
+def clean_response(res):
+    """
+    Ensure that the response is always a dict.
+    If it's a string, try to parse as JSON.
+    If parsing fails, wrap it in {'reply': str(res)}.
+    """
+    if isinstance(res, dict):
+        return res
+    if isinstance(res, str):
+        try:
+            return json.loads(res)
+        except json.JSONDecodeError:
+            return {"reply": res}
+    return {"reply": str(res)}
+
+
+async def save_pg_data_async(pg_data, path):
+    await asyncio.to_thread(pg_data.to_csv, path, index=False)
+
+
+# ---- shared stages ---- #
+
+def enhance(query, language, history):
+    res = clean_response(query_enhancer(query, language, history))
+    if res.get('reply') is not None:
+        raise StopPipeline({"text": res['reply']})
+    if res.get('enhanced_query') is None:
+        raise StopPipeline({"text": NOT_PROCESSED})
+    log.info("enhanced", enhanced_query=res['enhanced_query'])
+    return {"enhanced_query": res['enhanced_query']}
+
+
+def classify(enhanced_query):
+    res = clean_response(query_classifier(enhanced_query))
+    if res.get('search_type') not in ("sql", "vector"):
+        raise StopPipeline({"text": NOT_PROCESSED})
+    log.info("classified", search_type=res['search_type'])
+    return {"search_type": res['search_type']}
+
+
+def filters(enhanced_query, search_type):
+    res = clean_response(generate_filters(enhanced_query))
+    log.info("filters", where=res.get('where'))
+    if res.get('where') is None:
+        raise StopPipeline({"text": NOT_PROCESSED})
+    return {"where": res['where']}
+
+
+def vector_search(enhanced_query, where, search_type):
+    vector_ids = query_documents(enhanced_query, where)['ids'][0]
+    log.info("vector_search", hits=len(vector_ids), ids=vector_ids)
+    return {"vector_ids": vector_ids}
+
+
+def is_vector(search_type, **_):
+    return search_type == "vector"
+
+
+# ---- per-tab stages ---- #
+
+def sql_stage(tab):
+    def generate_sql(enhanced_query, vector_ids):
+        res = clean_response(sql_generator(enhanced_query, tab, vector_ids))
+        if res.get('error'):
+            raise StopPipeline({"text": f"Error generating SQL: {res['error']}"})
+        if res.get('sql') is None:
+            raise StopPipeline({"text": NO_SQL})
+        log.info("sql_generated", tab=tab, sql=res['sql'], sources_to_cite=res.get('sources_to_cite'))
+        return {f"{tab}_sql_response": res}
+
+    return Stage(
+        name=f"generate_sql_{tab}",
+        func=generate_sql,
+        inputs={"enhanced_query": str, "vector_ids": list},
+        outputs={f"{tab}_sql_response": dict},
+        memoize=True,
+    )
+
+
+def fetch_stage(tab):
+    def fetch(**inputs):
+        pg_data = retrieve_data_from_postgres(inputs[f"{tab}_sql_response"]['sql'])
+        if pg_data.empty:
+            raise StopPipeline({"text": NO_DATA})
+        return {f"{tab}_rows": pg_data}
+
+    return Stage(
+        name=f"fetch_{tab}",
+        func=fetch,
+        inputs={f"{tab}_sql_response": dict},
+        outputs={f"{tab}_rows": pd.DataFrame},
+        # not memoized: result frames can be hundreds of MB and must reflect newly ingested
+        # rows; the memoized SQL already saves the LLM round-trip
+    )
+
+
+def digest_theory(theory_rows):
+    return {"theory_digest": summarize_dataframe(theory_rows)}
+
+
+def answer_theory(enhanced_query, theory_digest, theory_sql_response, language, history):
+    final_ans_text = get_ans_with_relevant_data(
+        enhanced_query, theory_digest, history, theory_sql_response.get('sources_to_cite'), language
+    )
+    log.debug("final_answer", text=final_ans_text, chars=len(final_ans_text or ""))
+    return {"theory_result": {"text": final_ans_text}}
+
+
+def csv_stage(tab, message):
+    def write_csv(artifact_id, **inputs):
+        pg_data = inputs[f"{tab}_rows"]
+        csv_path = f"{CSV_DIRS[tab]}/{artifact_id}.csv"
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        asyncio.run(save_pg_data_async(pg_data, csv_path))
+        return {f"{tab}_result": {"text": message.format(rows=len(pg_data), shown=min(len(pg_data), 10)), "csv_url": csv_path}}
+
+    return Stage(
+        name=f"{tab}_csv",
+        func=write_csv,
+        inputs={f"{tab}_rows": pd.DataFrame, "artifact_id": str},
+        outputs={f"{tab}_result": dict},
+    )
+
+
+def build_answer_plan():
+    """
+    enhance -> classify -> [filters -> vector_search] -> generate_sql_<tab> -> fetch_<tab> -> sink,
+    where the sink is the final LLM answer (theory) or a CSV export (table, plot).
+    """
+    stages = [
+        # the enhancer resolves "last month"/"this year" against the current time, so its memo is per hour
+        Stage("enhance", enhance, {"query": str, "language": str, "history": list}, {"enhanced_query": str},
+              memoize=True, memo_scope=time_bucket),
+        Stage("classify", classify, {"enhanced_query": str}, {"search_type": str}, memoize=True),
+        Stage("filters", filters, {"enhanced_query": str, "search_type": str}, {"where": dict}, when=is_vector, memoize=True),
+        Stage("vector_search", vector_search, {"enhanced_query": str, "where": dict, "search_type": str}, {"vector_ids": list}, when=is_vector, memoize=True),
+    ]
+    for tab in TABS:
+        stages.append(sql_stage(tab))
+        stages.append(fetch_stage(tab))
+
+    stages += [
+        Stage("digest_theory", digest_theory, {"theory_rows": pd.DataFrame}, {"theory_digest": str}),
+        Stage(
+            "answer_theory", answer_theory,
+            {"enhanced_query": str, "theory_digest": str, "theory_sql_response": dict, "language": str, "history": list},
+            {"theory_result": dict},
+        ),
+        csv_stage("table", "Query returned {rows} row(s). Showing first {shown} rows."),
+        csv_stage("plot", "Query returned {rows} row(s). Data prepared for plotting visualization."),
+    ]
+    return Plan(stages)
+
+
+answer_plan = build_answer_plan()
+
+# Progress events emitted to streaming clients as stages finish
+STAGE_EVENTS = {
+    "enhance": lambda o: {"stage": "enhanced", "enhanced_query": o["enhanced_query"]},
+    "classify": lambda o: {"stage": "classified", "search_type": o["search_type"]},
+    "vector_search": lambda o: {"stage": "vector_searched", "float_ids": len(o["vector_ids"])},
+    "generate_sql_theory": lambda o: {"stage": "sql_generated", "sql": o["theory_sql_response"]["sql"]},
+    "fetch_theory": lambda o: {"stage": "rows_fetched", "rows": len(o["theory_rows"])},
+}
+
+
+# Outputs shared by every tab; a session keeps them for its last question so switching
+# tabs (or asking for several at once) only reruns the tab-specific SQL and rendering
+SHARED_KEYS = ["enhanced_query", "search_type", "where", "vector_ids"]
+SESSION_PLAN_LIMIT = int(os.getenv("SESSION_PLAN_LIMIT", "1000"))
+
+session_plans = OrderedDict()
+session_lock = threading.Lock()
+
+
+def session_values(session_id, query, language):
+    if not session_id:
+        return {}
+    with session_lock:
+        last = session_plans.get(session_id)
+        if last and last["query"] == query and last["language"] == language:
+            session_plans.move_to_end(session_id)
+            return dict(last["values"])
+    return {}
+
+
+def remember_session(session_id, query, language, run):
+    if not session_id or "enhanced_query" not in run.values:
+        return
+    values = {k: run.values[k] for k in SHARED_KEYS if k in run.values}
+    with session_lock:
+        session_plans[session_id] = {"query": query, "language": language, "values": values}
+        session_plans.move_to_end(session_id)
+        while len(session_plans) > SESSION_PLAN_LIMIT:
+            session_plans.popitem(last=False)
+
+
+def run_tabs(tabs, query, language, history=None, session_id=None, on_stage=None, targets=None, artifact_id=None):
+    """Run the shared plan once for several tabs; returns the run and {tab: result}."""
+    targets = targets or [f"{tab}_result" for tab in tabs]
+    seed = {"query": query, "language": language, "history": history or [], "artifact_id": artifact_id or DEFAULT_ARTIFACT_ID}
+    seed.update(session_values(session_id, query, language))
+
+    run = answer_plan.run(seed, targets, on_stage=on_stage)
+    remember_session(session_id, query, language, run)
+    return run, {tab: run.result(target) for tab, target in zip(tabs, targets)}
+
+
+def run_tab(tab, query, language, history=None, session_id=None, on_stage=None, target=None, artifact_id=None):
+    """Run the shared plan for one tab and return that tab's result dict."""
+    target = target or f"{tab}_result"
+    run, results = run_tabs([tab], query, language, history, session_id, on_stage, [target], artifact_id)
+    return run, results[tab]
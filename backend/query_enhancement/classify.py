@@ -1,15 +1,13 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+import json
+from llm_client.router import chat_completion
+from resilience.retry import resilient
+from query_enhancement.route import fast_search_type
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY1")
 
 
 
-
-def query_classifier(query):
-    SYSTEM_PROMPT = """
+# Static, so it is byte-identical on every call and cacheable as a prompt prefix
+SYSTEM_PROMPT = """
 
         You are FloatChat, an AI-powered assistant for ARGO float oceanographic data. You are also a query classifier for FloatChat. Remember that if you select SQL, then that query doesnt require 
             vector db search, else if you select vector then both SQL and vector search will be done for that query
@@ -54,18 +52,21 @@ def query_classifier(query):
     """
 
 
-    client = OpenAI(
-        api_key=GEMINI_API_KEY,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
-
+@resilient("gemini")
+def query_classifier(query):
+    # Most queries are decided by sea names / metadata terms alone, no LLM needed
+    search_type = fast_search_type(query)
+    if search_type is not None:
+        return json.dumps({"search_type": search_type})
 
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": query}
     ]
 
-    response = client.chat.completions.create(
+    response = chat_completion(
+        preferred_key="GEMINI_API_KEY1",
+        stage="classify",
         model="gemini-2.5-flash",
         messages=messages,
         response_format={"type": "json_object"}
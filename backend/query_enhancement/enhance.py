@@ -251,34 +251,35 @@
 #     return response.choices[0].message.content
 
 
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+import json
+from llm_client.router import chat_completion
+from resilience.retry import resilient
+from query_enhancement.intent import fast_reply
 from datetime import datetime
 import pytz
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY1")
-
 india_tz = pytz.timezone("Asia/Kolkata")
-current_time_india = datetime.now(india_tz).strftime("%Y-%m-%d %H:%M:%S")
 
-def query_enhancer(user_query, language, history):
-    
-    SYSTEM_PROMPT = f"""
-LANGUAGE: {language}
 
+def time_bucket():
+    """The hour the enhancer's CURRENT_TIME_INDIA falls in; relative dates ("last month") resolve the same within it."""
+    return datetime.now(india_tz).strftime("%Y-%m-%d %H")
+
+
+# Static so it is a byte-stable prefix (cacheable); the language and the current time
+# change per call and are sent with the user message instead
+SYSTEM_PROMPT = """
 You are Anantha, an AI-powered assistant specialized only in ARGO float oceanographic data discovery, exploration, and visualization. 
 Your role is to **enhance user queries into detailed natural-language queries** for better database or vector retrieval, while also handling irrelevant queries or chit-chat.
 Enhance only the user query, don’t add unrelated content.
 
 IMPORTANT CONTEXT:
-- Current date and time in India (absolute ground-truth, do not override, assume, or guess): {current_time_india}
+- The current date and time in India is given as CURRENT_TIME_INDIA with each user message (absolute ground-truth, do not override, assume, or guess).
 - If the user asks about "today", "now", "current date", or "current time", you MUST use this exact value. 
 - Never reject or modify this value (e.g., don’t say "2025 is in the future").
 
 ⚠️ Critical Rule for Time:
-- Always trust the provided current date and time: {current_time_india}.
+- Always trust the provided CURRENT_TIME_INDIA.
 - If this date is later than the periods mentioned in the query (e.g., "summer 2025"), treat those periods as historical and available for analysis.
 - Never contradict this provided date/time, and never claim that it is "in the future".
 
@@ -308,7 +309,7 @@ Behavior Rules:
    - Always remind the user you can help with ARGO float data.
 
 4. **Date & Time Usage**:
-   - Always use the provided ground-truth date and time: {current_time_india}.
+   - Always use the provided ground-truth CURRENT_TIME_INDIA.
    - Do not assume or invent other dates/times.
    - If a query involves “today,” “current,” or “now,” substitute directly with this provided date/time.
 
@@ -320,30 +321,34 @@ Behavior Rules:
 Output Format:
 - Always respond in **valid JSON only**.
 - For relevant queries:
-  {{
+  {
     "enhanced_query": "<enhanced natural-language query>"
-  }}
+  }
 - For theoretical (non-data but still ARGO related):
-  {{
+  {
     "reply": "<theoretical-answer>"
-  }}
+  }
 - For irrelevant/chit-chat:
-  {{
+  {
     "reply": "<polite/friendly message in same language as user query>"
-  }}
+  }
 
 Rules:
-- Detect user input language and respond in that language for `"reply"`.
+- Respond in the LANGUAGE given with the user message for `"reply"` (or the user's input language if none is given).
 - Never generate SQL or code.
 - Never output anything outside JSON.
 - Always encourage ARGO-related queries if the user goes off-topic.
 """
 
 
-    client = OpenAI(
-        api_key=GEMINI_API_KEY,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
+@resilient("gemini")
+def query_enhancer(user_query, language, history):
+    # Greetings and off-topic questions are answered locally, no LLM round trip
+    reply = fast_reply(user_query, language, history)
+    if reply is not None:
+        return json.dumps({"reply": reply})
+
+    current_time_india = datetime.now(india_tz).strftime("%Y-%m-%d %H:%M:%S")
 
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
@@ -354,9 +359,15 @@ Rules:
           messages.append({"role": "user", "content": h['question']})
           messages.append({"role": "assistant", "content": h['answer']})
 
-    messages.append({"role": "user", "content": user_query})
+    # Per-call context goes last so everything before it stays cacheable
+    messages.append({
+        "role": "user",
+        "content": f"LANGUAGE: {language}\nCURRENT_TIME_INDIA: {current_time_india}\n\n{user_query}"
+    })
 
-    response = client.chat.completions.create(
+    response = chat_completion(
+        preferred_key="GEMINI_API_KEY1",
+        stage="enhance",
         model="gemini-2.5-flash",
         messages=messages,
         response_format={"type": "json_object"}
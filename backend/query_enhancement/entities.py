@@ -0,0 +1,265 @@
+import os
+import re
+from dotenv import load_dotenv
+from query_enhancement.vocabulary import Automaton, IHO_NAMES, iho_aliases
+from query_enhancement.route import unknown_proper_nouns
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+# Compile Chroma where-filters locally, only ask the LLM for what we can't parse
+FILTERS_FAST_PATH = os.getenv("FILTERS_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+# Parameter wording -> the PARAMETER names stored as "HAS <PARAM>" flags by vector_db_pipeline.py
+PARAMETERS = {
+    "temperature": "TEMP", "temp": "TEMP", "salinity": "PSAL", "psal": "PSAL",
+    "pressure": "PRES", "pres": "PRES", "oxygen": "DOXY", "dissolved oxygen": "DOXY", "doxy": "DOXY",
+    "chlorophyll": "CHLA", "chla": "CHLA", "nitrate": "NITRATE", "backscatter": "BBP700",
+    "ph": "PH_IN_SITU_TOTAL", "cdom": "CDOM", "irradiance": "DOWN_IRRADIANCE380",
+}
+
+STATUSES = {
+    "terminated": "Terminated", "dropped": "Dropped", "recovered": "Recovered",
+    "technical failure": "Technical Failure", "stopped": "Stopped",
+}
+
+# Every float in the collection comes from the INCOIS DAC, so these narrow nothing
+NO_OP_TERMS = ["incois", "indian national centre for ocean information services"]
+
+# Wording we can't compile reliably (names, free text fields), leave those to the LLM
+LEFTOVER_TERMS = [
+    "pi", "pi name", "principal investigator", "institution", "institute", "project", "platform",
+    "maker", "manufacturer", "model", "serial", "similar", "wmo", "number of profiles", "profiles count",
+]
+
+# Top-level metadata keys present in Chroma (see mdata in vector_db_pipeline.py)
+METADATA_FIELDS = {
+    "FLOAT_ID", "END_MISSION_STATUS", "MISSION_DURATION_DAYS", "DOMINANT_REGION", "REGIONS_VISITED",
+    "LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX", "CENTROID_LAT", "CENTROID_LON", "FIRST_REGION",
+    "LAST_REGION", "LAUNCH_DATE", "START_DATE", "END_MISSION_DATE",
+}
+
+COMPARATORS = {
+    "more than": "$gt", "greater than": "$gt", "over": "$gt", "above": "$gt", "longer than": "$gt",
+    "at least": "$gte", "minimum of": "$gte", "no less than": "$gte",
+    "less than": "$lt", "fewer than": "$lt", "under": "$lt", "below": "$lt", "shorter than": "$lt",
+    "at most": "$lte", "maximum of": "$lte", "no more than": "$lte", "up to": "$lte",
+}
+
+NUMBER = r"(-?\d+(?:\.\d+)?|a|an|one)"
+COMPARATOR_RE = re.compile(
+    r"\b(" + "|".join(sorted(COMPARATORS, key=len, reverse=True)) + r")\s+" + NUMBER +
+    r"\s*(years?|months?|days?|°\s*[nsew]|degrees?\s*(?:north|south|east|west)|[nsew]\b)"
+)
+BETWEEN_RE = re.compile(
+    r"\bbetween\s+(-?\d+(?:\.\d+)?)\s*(°\s*[nsew]|[nsew]\b)?\s+and\s+(-?\d+(?:\.\d+)?)\s*(°\s*[nsew]|[nsew]\b)"
+)
+FLOAT_ID_RE = re.compile(r"\b(?:float|wmo|platform)(?:\s+(?:id|number|no\.?))?\s*#?\s*(\d{7})\b")
+
+# "over"/"under" are durations only next to mission wording ("operating for over 3 years"),
+# otherwise they are time spans ("how did salinity change over 3 years")
+LOOSE_COMPARATORS = ("over", "under")
+DURATION_CONTEXT_RE = re.compile(r"\b(mission|missions|lasting|lasted|lasts|operating|operated|active|duration|lifetime|deployed for|running)\b")
+DURATION_CONTEXT_CHARS = 40
+
+# compile_where can only AND positive clauses; negations and alternatives go to the LLM
+NEGATION_RE = re.compile(
+    r"\b(?:not|never|none|without|except|excluding|exclude[sd]?|other than|outside|apart from)\b|n't\b"
+    r"|\bno\b(?!\s+(?:less|more|fewer|longer|shorter)\s+than)"
+)
+DISJUNCTION_RE = re.compile(r"\b(?:or|either)\b")
+# Several seas only narrow to floats that visited all of them when the query says so;
+# otherwise ("compare the Arabian Sea and the Bay of Bengal") any one of them will do
+ALL_REGIONS_RE = re.compile(r"\b(?:both|all of|each of|every one of)\b")
+
+
+def build_automaton():
+    phrases = {}
+    for name in IHO_NAMES:
+        for alias in iho_aliases(name):
+            phrases[alias] = ("region", name)
+    for term, param in PARAMETERS.items():
+        phrases[term] = ("parameter", param)
+    for term, status in STATUSES.items():
+        phrases[term] = ("status", status)
+    for term in NO_OP_TERMS:
+        phrases[term] = ("no_op", term)
+    for term in LEFTOVER_TERMS:
+        phrases.setdefault(term, ("leftover", term))
+    return Automaton(phrases)
+
+
+automaton = build_automaton()
+
+
+def _number(text):
+    return 1.0 if text in ("a", "an", "one") else float(text)
+
+
+def _axis(unit):
+    """(field family, sign) for a coordinate unit like '°N', 'e', 'degrees south'."""
+    unit = unit.replace("degrees", "").replace("degree", "").replace("°", "").strip()
+    hemisphere = unit[:1]
+    if hemisphere in ("n", "s"):
+        return "LAT", 1 if hemisphere == "n" else -1
+    return "LON", 1 if hemisphere == "e" else -1
+
+
+def numeric_clauses(text):
+    """$gt/$lt clauses from phrases like 'more than 2 years', 'below 10°N', 'between 60E and 70E'."""
+    clauses, leftovers = [], []
+
+    understood = []
+    for m in COMPARATOR_RE.finditer(text):
+        op, value, unit = COMPARATORS[m.group(1)], _number(m.group(2)), m.group(3)
+        is_duration = unit.startswith(("year", "month", "day"))
+        if is_duration and m.group(1) in LOOSE_COMPARATORS and \
+                not DURATION_CONTEXT_RE.search(text[max(0, m.start() - DURATION_CONTEXT_CHARS):m.start()]):
+            continue        # reported as a leftover below
+        understood.append(m.span())
+        if unit.startswith("year"):
+            clauses.append({"MISSION_DURATION_DAYS": {op: round(value * 365)}})
+        elif unit.startswith("month"):
+            clauses.append({"MISSION_DURATION_DAYS": {op: round(value * 30)}})
+        elif unit.startswith("day"):
+            clauses.append({"MISSION_DURATION_DAYS": {op: round(value)}})
+        else:
+            axis, sign = _axis(unit)
+            clauses.append({f"CENTROID_{axis}": {op: value * sign}})
+
+    for m in BETWEEN_RE.finditer(text):
+        low_unit = m.group(2) or m.group(4)
+        axis, sign = _axis(low_unit)
+        axis_hi, sign_hi = _axis(m.group(4))
+        if axis != axis_hi:
+            leftovers.append(m.group(0))
+            continue
+        low, high = sorted([float(m.group(1)) * sign, float(m.group(3)) * sign_hi])
+        clauses.append({f"CENTROID_{axis}": {"$gte": low}})
+        clauses.append({f"CENTROID_{axis}": {"$lte": high}})
+
+    # numbers next to comparison words that we did not understand
+    covered = understood + [m.span() for m in BETWEEN_RE.finditer(text)]
+    for m in re.finditer(r"\b(" + "|".join(COMPARATORS) + r")\s+\d", text):
+        if not any(s <= m.start() < e for s, e in covered):
+            leftovers.append(m.group(0))
+
+    return clauses, leftovers
+
+
+def extract_entities(query):
+    """Regions, parameters, statuses, float ids, numeric clauses and leftover wording in a query."""
+    text = query.lower()
+    entities = {"regions": [], "parameters": [], "statuses": [], "float_ids": [], "numeric": [], "leftovers": []}
+    entities["all_regions"] = bool(ALL_REGIONS_RE.search(text))
+
+    matches = automaton.find_longest(text)
+    region_spans = []
+    for start, end, (kind, value) in matches:
+        if kind == "region":
+            region_spans.append((start, end))
+            if value not in entities["regions"]:
+                entities["regions"].append(value)
+        elif kind == "parameter" and value not in entities["parameters"]:
+            entities["parameters"].append(value)
+        elif kind == "status" and value not in entities["statuses"]:
+            entities["statuses"].append(value)
+        elif kind == "leftover":
+            entities["leftovers"].append(value)
+
+    entities["leftovers"] += [m.group(0) for m in NEGATION_RE.finditer(text)]
+    # "or" inside a sea name ("Andaman or Burma Sea") is not a disjunction
+    entities["leftovers"] += [
+        m.group(0) for m in DISJUNCTION_RE.finditer(text)
+        if not any(s <= m.start() < e for s, e in region_spans)
+    ]
+
+    entities["float_ids"] = list(dict.fromkeys(FLOAT_ID_RE.findall(text)))
+    entities["numeric"], numeric_leftovers = numeric_clauses(text)
+    entities["leftovers"] += numeric_leftovers
+
+    # Place names outside the IHO list need lat/lon bounds, which the LLM is better at
+    entities["leftovers"] += unknown_proper_nouns(query, automaton.find_longest(query))
+    return entities
+
+
+def compile_where(entities):
+    """Chroma where-filter from extracted entities, in the shape the filters prompt asks for."""
+    visited = [{f"VISITED {region.upper()}": True} for region in entities["regions"]]
+    if len(visited) > 1 and not entities.get("all_regions"):
+        clauses = [{"$or": visited}]
+    else:
+        clauses = visited
+    clauses += [{f"HAS {param}": True} for param in entities["parameters"]]
+    clauses += [{"END_MISSION_STATUS": status} for status in entities["statuses"]]
+    if len(entities["float_ids"]) == 1:
+        clauses.append({"FLOAT_ID": entities["float_ids"][0]})
+    elif entities["float_ids"]:
+        clauses.append({"FLOAT_ID": {"$in": entities["float_ids"]}})
+    clauses += entities["numeric"]
+
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+SCALAR = (str, int, float, bool)
+OPERATORS = {
+    "$eq": SCALAR, "$ne": SCALAR, "$gt": (int, float), "$gte": (int, float),
+    "$lt": (int, float), "$lte": (int, float), "$in": list, "$nin": list,
+}
+
+
+def is_known_field(field):
+    return field in METADATA_FIELDS or field.startswith("HAS ") or field.startswith("VISITED ")
+
+
+def validate_where(where):
+    """Checks a filter against the 'Chroma Metadata Where Filter Schema' embedded in filters.py."""
+    if not isinstance(where, dict) or not where:
+        return False
+
+    if any(k.startswith("$") for k in where):
+        if len(where) != 1:
+            return False
+        op, items = next(iter(where.items()))
+        return op in ("$and", "$or") and isinstance(items, list) and len(items) >= 2 and all(validate_where(i) for i in items)
+
+    for field, value in where.items():
+        if not is_known_field(field):
+            return False
+        if isinstance(value, dict):
+            if len(value) != 1:
+                return False
+            op, operand = next(iter(value.items()))
+            if op not in OPERATORS or not isinstance(operand, OPERATORS[op]) or isinstance(operand, bool) and op in ("$gt", "$gte", "$lt", "$lte"):
+                return False
+            if op in ("$in", "$nin"):
+                if not operand or len({type(x) for x in operand}) != 1 or not isinstance(operand[0], SCALAR):
+                    return False
+        elif not isinstance(value, SCALAR):
+            return False
+    return True
+
+
+def local_where(query):
+    """Where-filter compiled locally, or None if the query has parts only the LLM can handle."""
+    if not FILTERS_FAST_PATH:
+        return None
+
+    entities = extract_entities(query)
+    if entities["leftovers"]:
+        log.info("filters_need_llm", leftovers=entities["leftovers"])
+        return None
+
+    where = compile_where(entities)
+    if where == {} or not validate_where(where):
+        return None
+
+    log.info("filters_local", where=where)
+    return where
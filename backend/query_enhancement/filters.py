@@ -1,15 +1,13 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+import json
+from llm_client.router import chat_completion
+from resilience.retry import resilient
+from query_enhancement.entities import local_where
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY1")
 
 
 
-
-def generate_filters(query):
-    SYSTEM_PROMPT = """
+# Static, so it is byte-identical on every call and cacheable as a prompt prefix
+SYSTEM_PROMPT = """
 You are an expert AI assistant for FloatChat and your job is to generate "where" filters for chroma db matadata filtering. 
 
 ### Core Rules:
@@ -246,19 +244,22 @@ Output Schema:
 """
 
 
-
-    client = OpenAI(
-        api_key=GEMINI_API_KEY,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
-
+@resilient("gemini")
+def generate_filters(query):
+    # Seas, sensors, float ids and numeric bounds compile locally; the LLM only sees
+    # queries with parts we can't map (PI names, place names, unparsed numbers)
+    where = local_where(query)
+    if where is not None:
+        return json.dumps({"where": where})
 
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": query}
     ]
 
-    response = client.chat.completions.create(
+    response = chat_completion(
+        preferred_key="GEMINI_API_KEY1",
+        stage="filters",
         model="gemini-2.5-flash",
         messages=messages,
         response_format={"type": "json_object"}
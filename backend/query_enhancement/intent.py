@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import threading
+from dotenv import load_dotenv
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+
+
+load_dotenv()
+
+# Answer greetings / off-topic queries locally instead of a query_enhancer round trip
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() in ("1", "true", "yes")
+# Model must be at least this sure before we answer without the LLM
+INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", "0.85"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES_PATH = os.path.join(BASE_DIR, "intent_samples.json")
+CHAT_HISTORY_PATH = os.path.join(BASE_DIR, "..", "chat_history.json")
+
+GREETING_RE = re.compile(
+    r"^(hi+|hey+|hello+|howdy|yo|namaste|namaskar(am)?|vanakkam|good (morning|afternoon|evening)|"
+    r"नमस्ते|नमस्कार|வணக்கம்|నమస్కారం|నమస్తే)( there| floatchat| anantha)?$"
+)
+THANKS_RE = re.compile(
+    r"^((ok(ay)? |great |cool )?(thanks?|thank you|thx|ty)( so much| a lot| for the help)?|"
+    r"dhanyavad|shukriya|nandri|bye|goodbye|see you|धन्यवाद|நன்றி|ధన్యవాదాలు)$"
+)
+
+# Any of these means a real data question, always escalate to the LLM pipeline
+DOMAIN_TERMS = re.compile(
+    r"\b(argo|floats?|ocean\w*|seas?|bay|gulf|strait|channel|temp\w*|salin\w*|psal|pres\w*|depth|dbar|"
+    r"profiles?|trajector\w*|drift|bgc|oxygen|doxy|chlorophyll|nitrate|currents?|marine|wmo|incois|"
+    r"sensors?|lat\w*|lon\w*|coast\w*|plot|table|data|measure\w*|qc|mission|deploy\w*|launch\w*)\b"
+)
+
+REPLIES = {
+    "greeting": {
+        "english": "Hello! I'm FloatChat, here to help you explore ARGO float oceanographic data. Ask me about temperature, salinity, pressure or float trajectories.",
+        "hindi": "नमस्ते! मैं FloatChat हूँ, ARGO फ्लोट के समुद्री डेटा को समझने में आपकी मदद के लिए। तापमान, लवणता, दबाव या फ्लोट के मार्ग के बारे में पूछिए।",
+        "tamil": "வணக்கம்! நான் FloatChat, ARGO மிதவைகளின் கடல்சார் தரவுகளை ஆராய உங்களுக்கு உதவுவேன். வெப்பநிலை, உப்புத்தன்மை, அழுத்தம் அல்லது மிதவைகளின் பயணப் பாதை பற்றி கேளுங்கள்.",
+        "telugu": "నమస్కారం! నేను FloatChat, ARGO ఫ్లోట్ సముద్ర డేటాను అన్వేషించడంలో మీకు సహాయం చేస్తాను. ఉష్ణోగ్రత, లవణీయత, పీడనం లేదా ఫ్లోట్ ప్రయాణ మార్గం గురించి అడగండి.",
+    },
+    "thanks": {
+        "english": "You're welcome! Feel free to ask anything about ARGO float data.",
+        "hindi": "आपका स्वागत है! ARGO फ्लोट डेटा से जुड़ा कोई भी सवाल बेझिझक पूछिए।",
+        "tamil": "மகிழ்ச்சி! ARGO மிதவை தரவு பற்றி எதுவும் தயங்காமல் கேளுங்கள்.",
+        "telugu": "మీకు స్వాగతం! ARGO ఫ్లోట్ డేటా గురించి ఏదైనా సంకోచించకుండా అడగండి.",
+    },
+    "off_topic": {
+        "english": "I can only answer queries related to ARGO float data, its parameters (temperature, salinity, pressure, BGC), and their visualizations.",
+        "hindi": "मैं केवल ARGO फ्लोट डेटा, उसके मापदंडों (तापमान, लवणता, दबाव, BGC) और उनके विज़ुअलाइज़ेशन से जुड़े सवालों का जवाब दे सकता हूँ।",
+        "tamil": "ARGO மிதவை தரவு, அதன் அளவுருக்கள் (வெப்பநிலை, உப்புத்தன்மை, அழுத்தம், BGC) மற்றும் அவற்றின் காட்சிப்படுத்தல்கள் தொடர்பான கேள்விகளுக்கு மட்டுமே என்னால் பதிலளிக்க முடியும்.",
+        "telugu": "నేను ARGO ఫ్లోట్ డేటా, దాని పరామితులు (ఉష్ణోగ్రత, లవణీయత, పీడనం, BGC) మరియు వాటి విజువలైజేషన్లకు సంబంధించిన ప్రశ్నలకు మాత్రమే సమాధానం ఇవ్వగలను.",
+    },
+}
+
+_model = None
+_lock = threading.Lock()
+
+
+def normalize(query):
+    return re.sub(r"[\s!?.,:;]+", " ", query.strip().lower()).strip()
+
+
+def rule_intent(text):
+    if GREETING_RE.match(text):
+        return "greeting"
+    if THANKS_RE.match(text):
+        return "thanks"
+    return None
+
+
+def load_samples():
+    """Labelled samples, plus the questions in chat_history.json (greetings by rule, the rest ARGO)."""
+    with open(SAMPLES_PATH, encoding="utf-8") as f:
+        samples = json.load(f)
+
+    texts, labels = [], []
+    for label, queries in samples.items():
+        texts += [normalize(q) for q in queries]
+        labels += [label] * len(queries)
+
+    if os.path.exists(CHAT_HISTORY_PATH):
+        with open(CHAT_HISTORY_PATH, encoding="utf-8") as f:
+            for turn in json.load(f):
+                q = normalize(turn.get("question") or "")
+                if q:
+                    texts.append(q)
+                    labels.append(rule_intent(q) or "argo")
+    return texts, labels
+
+
+def get_model():
+    """Char n-gram TF-IDF + logistic regression, trained on first use (a few ms)."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                texts, labels = load_samples()
+                model = make_pipeline(
+                    TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True),
+                    LogisticRegression(max_iter=1000, class_weight="balanced"),
+                )
+                model.fit(texts, labels)
+                _model = model
+    return _model
+
+
+def classify_intent(query, use_model=True):
+    """Returns (intent, confidence); intent is greeting, thanks, off_topic or argo."""
+    text = normalize(query)
+    if not text:
+        return "greeting", 1.0
+
+    intent = rule_intent(text)
+    if intent:
+        return intent, 1.0
+
+    if DOMAIN_TERMS.search(text) or not use_model:
+        return "argo", 1.0
+
+    model = get_model()
+    probs = model.predict_proba([text])[0]
+    best = probs.argmax()
+    return model.classes_[best], float(probs[best])
+
+
+def fast_reply(query, language="english", history=None):
+    """
+    Canned reply for greetings / thanks / off-topic queries in the requested language,
+    or None when the query has to go to the LLM (data questions, low confidence,
+    or a language we have no canned text for). With history, only the exact-match rules
+    apply, since short follow-ups ("and in 2021?") need the conversation to make sense.
+    """
+    if not INTENT_FAST_PATH:
+        return None
+
+    intent, confidence = classify_intent(query, use_model=not history)
+    if intent not in REPLIES or confidence < INTENT_CONFIDENCE:
+        return None
+
+    return REPLIES[intent].get((language or "english").strip().lower())
@@ -0,0 +1,98 @@
+import os
+import re
+from dotenv import load_dotenv
+from query_enhancement.vocabulary import (
+    Automaton, IHO_NAMES, iho_aliases, METADATA_TERMS, SEMANTIC_TERMS, SQL_TERMS, AMBIGUOUS_TERMS,
+)
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+# Route sql/vector locally and only ask the LLM when the local router is unsure
+CLASSIFY_FAST_PATH = os.getenv("CLASSIFY_FAST_PATH", "true").lower() in ("1", "true", "yes")
+CLASSIFY_CONFIDENCE = float(os.getenv("CLASSIFY_CONFIDENCE", "0.8"))
+
+# Capitalized words that are not place names
+KNOWN_WORDS = {
+    "argo", "bgc", "psal", "temp", "pres", "qc", "ctd", "utc", "ist", "iso", "sql", "id", "ids", "wmo", "doxy",
+    "retrieve", "show", "list", "plot", "get", "give", "display", "provide", "calculate",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+
+
+def build_automaton():
+    phrases = {}
+    for name in IHO_NAMES:
+        for alias in iho_aliases(name):
+            phrases[alias] = ("region", name)
+    for term, field in METADATA_TERMS.items():
+        phrases.setdefault(term, ("metadata", field))
+    for term in AMBIGUOUS_TERMS:
+        phrases.setdefault(term, ("ambiguous", term))
+    for term in SEMANTIC_TERMS:
+        phrases.setdefault(term, ("semantic", term))
+    for term in SQL_TERMS:
+        phrases.setdefault(term, ("sql", term))
+    return Automaton(phrases)
+
+
+automaton = build_automaton()
+
+
+def unknown_proper_nouns(query, matches):
+    """Capitalized words mid-sentence that none of our vocabularies explain (likely place names)."""
+    covered = set()
+    for start, end, _ in matches:
+        covered.update(range(start, end))
+
+    unknown = []
+    for m in re.finditer(r"(?<![.!?]\s)(?<!^)\b([A-Z][a-z]+)\b", query):
+        if m.start() not in covered and m.group(1).lower() not in KNOWN_WORDS:
+            unknown.append(m.group(1))
+    return unknown
+
+
+def local_search_type(query):
+    """
+    ("sql" | "vector" | None, confidence, reason) using the same lexical rules as the
+    query_classifier prompt: any IHO sea/ocean name, metadata field or fuzzy/location
+    wording means vector; numeric columns and aggregations alone mean sql. Words the
+    prompt sends both ways ("nearest", "find") get a confidence below the fast-path threshold.
+    """
+    matches = automaton.find_longest(query)
+    kinds = {}
+    for _, _, (kind, value) in matches:
+        kinds.setdefault(kind, []).append(value)
+
+    if kinds.get("region"):
+        return "vector", 1.0, f"region: {kinds['region'][0]}"
+    if kinds.get("metadata"):
+        return "vector", 0.95, f"metadata: {kinds['metadata'][0]}"
+    if kinds.get("ambiguous"):
+        return "sql" if kinds.get("sql") else "vector", 0.5, f"ambiguous: {kinds['ambiguous'][0]}"
+    if kinds.get("semantic"):
+        return "vector", 0.9, f"semantic: {kinds['semantic'][0]}"
+
+    if kinds.get("sql"):
+        unknown = unknown_proper_nouns(query, matches)
+        if unknown:
+            # "temperature in Chennai" - probably a place, let the LLM decide
+            return "sql", 0.5, f"unknown names: {unknown}"
+        return "sql", 0.9, f"columns: {kinds['sql'][:3]}"
+
+    return None, 0.0, "no known terms"
+
+
+def fast_search_type(query):
+    """search_type if the local router is confident enough, else None (ask the LLM)."""
+    if not CLASSIFY_FAST_PATH:
+        return None
+    search_type, confidence, reason = local_search_type(query)
+    if search_type is None or confidence < CLASSIFY_CONFIDENCE:
+        return None
+    log.info("classified_locally", search_type=search_type, reason=reason)
+    return search_type
@@ -0,0 +1,168 @@
+import os
+import re
+import struct
+from collections import deque
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IHO_DBF_PATH = os.path.join(BASE_DIR, "..", "identify_drift", "World_Seas_IHO_v3", "World_Seas_IHO_v3.dbf")
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton over lowercase phrases. find() returns every whole-word
+    occurrence in one pass over the text, however many phrases are loaded.
+    """
+
+    def __init__(self, phrases):
+        # phrases: {phrase: value}
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for phrase, value in phrases.items():
+            self._add(phrase.lower(), value)
+        self._build()
+
+    def _add(self, phrase, value):
+        node = 0
+        for ch in phrase:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append((len(phrase), value))
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if self.goto[f].get(ch, 0) != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """[(start, end, value)] for whole-word matches, longest match first at each end."""
+        text = text.lower()
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, value in self.out[node]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, end, value))
+        return matches
+
+    def find_longest(self, text):
+        """Matches with overlaps removed, preferring the longest phrase ("arabian sea" over "sea")."""
+        chosen, taken = [], set()
+        for start, end, value in sorted(self.find(text), key=lambda m: (m[0] - m[1], m[0])):
+            if not taken.intersection(range(start, end)):
+                chosen.append((start, end, value))
+                taken.update(range(start, end))
+        return sorted(chosen)
+
+
+def read_iho_records(path=IHO_DBF_PATH):
+    """Rows of the IHO seas shapefile's .dbf (NAME, centroid Longitude/Latitude, bounds), no geopandas needed."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    n_records, header_len, record_len = struct.unpack("<4xIHH", data[:12])
+    offset, pos, fields = 1, 32, []
+    while data[pos] != 0x0D:
+        name = data[pos:pos + 11].split(b"\0")[0].decode("ascii")
+        kind, length = chr(data[pos + 11]), data[pos + 16]
+        fields.append((name, kind, offset, length))
+        offset += length
+        pos += 32
+
+    records = []
+    for r in range(n_records):
+        rec = header_len + r * record_len
+        row = {}
+        for name, kind, start, length in fields:
+            raw = data[rec + start:rec + start + length].decode("utf-8", errors="ignore").strip()
+            if kind in ("N", "F"):
+                try:
+                    row[name] = float(raw)
+                except ValueError:
+                    row[name] = None
+            else:
+                row[name] = raw
+        records.append(row)
+    return records
+
+
+def read_iho_names(path=IHO_DBF_PATH):
+    """NAME column of the IHO seas shapefile."""
+    return [r["NAME"] for r in read_iho_records(path) if r["NAME"]]
+
+
+def iho_aliases(name):
+    """Ways a region is written in a query: "Andaman or Burma Sea" -> andaman sea, burma sea, ..."""
+    lower = name.lower()
+    aliases = {lower}
+    base = re.sub(r"\s*-\s*(eastern|western) basin$", "", lower)
+    aliases.add(base)
+    m = re.match(r"^(.*) \((.*)\)$", base)
+    if m:
+        aliases.update({m.group(1), m.group(2), f"{m.group(1)} sea"})
+    m = re.match(r"^(\w+) or (\w+) (sea|strait|channel)$", base)
+    if m:
+        aliases.update({f"{m.group(1)} {m.group(3)}", f"{m.group(2)} {m.group(3)}"})
+    if " or " in base:
+        aliases.update(part.strip() for part in base.split(" or "))
+    aliases.add(base.replace("barentsz", "barents").replace("molukka", "molucca"))
+    if base.startswith("the "):
+        aliases.add(base[4:])
+    return {a for a in aliases if len(a) > 3}
+
+
+IHO_NAMES = read_iho_names()
+
+# Vector DB metadata vocabulary (see the metadata fields in classify.py / filters.py)
+METADATA_TERMS = {
+    "wmo": "WMO_INST_TYPE", "pi": "PI_NAME", "pi name": "PI_NAME", "principal investigator": "PI_NAME",
+    "institution": "OPERATING_INSTITUTION", "operating institution": "OPERATING_INSTITUTION",
+    "institute": "OPERATING_INSTITUTION", "incois": "OPERATING_INSTITUTION",
+    "project": "PROJECT_NAME", "launch": "LAUNCH_DATE", "launched": "LAUNCH_DATE",
+    "deployed": "LAUNCH_DATE", "deployment": "LAUNCH_DATE", "mission": "END_MISSION_STATUS",
+    "end mission": "END_MISSION_STATUS", "mission duration": "MISSION_DURATION_DAYS",
+    "mission status": "END_MISSION_STATUS", "number of profiles": "NUM_PROFILES",
+    "platform": "PLATFORM_TYPE", "platform type": "PLATFORM_TYPE", "platform maker": "PLATFORM_MAKER",
+    "maker": "PLATFORM_MAKER", "manufacturer": "PLATFORM_MAKER", "sensor": "SENSORS", "sensors": "SENSORS",
+    "dominant region": "DOMINANT_REGION", "regions visited": "REGIONS_VISITED", "visited": "REGIONS_VISITED",
+    "region": "REGIONS_VISITED", "regions": "REGIONS_VISITED", "centroid": "CENTROID_LAT",
+    "first region": "FIRST_REGION", "last region": "LAST_REGION",
+    "latitude": "CENTROID_LAT", "longitude": "CENTROID_LON",
+}
+
+# Semantic / fuzzy / location wording that the classifier prompt sends to vector search
+SEMANTIC_TERMS = [
+    "similar", "compare", "compared", "comparing", "comparison", "versus", "vs",
+    "km", "kilometers", "kilometres",
+    "coast", "area", "areas", "place", "places", "location", "located", "off the coast",
+    "ocean", "sea", "bay", "gulf", "strait", "channel",
+]
+
+# Words the classifier prompt sends both ways ("nearest float to a location" is SQL,
+# "find"/"places" are vector); when they appear without a sea name or metadata field the LLM decides
+AMBIGUOUS_TERMS = ["nearest", "near", "closest", "around", "find"]
+
+# Columns and operations of argo_data_clean; on their own they mean plain SQL
+SQL_TERMS = [
+    "temperature", "temp", "salinity", "psal", "pressure", "pres", "depth", "dbar", "profile",
+    "profiles", "average", "mean", "maximum", "minimum", "max", "min", "count", "trend", "trends",
+    "time series", "date", "year", "month", "between", "float id", "float_id", "qc", "level", "levels",
+]
@@ -0,0 +1,174 @@
+import os
+import time
+import random
+import sqlite3
+import importlib
+import threading
+import functools
+from dotenv import load_dotenv
+from observability.log import get_logger
+
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+STAGE_RETRIES = int(os.getenv("STAGE_RETRIES", "3"))
+STAGE_BACKOFF_BASE = float(os.getenv("STAGE_BACKOFF_BASE", "0.5"))
+STAGE_BACKOFF_MAX = float(os.getenv("STAGE_BACKOFF_MAX", "8"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+
+class DependencyUnavailable(Exception):
+    """Raised when a dependency's breaker is open or a stage ran out of retries."""
+
+    def __init__(self, dependency, message):
+        super().__init__(message)
+        self.dependency = dependency
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+    After BREAKER_FAILURES consecutive failures calls fail fast for BREAKER_RESET_SECONDS,
+    then a single trial call decides whether to close again.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release(self):
+        """End a half-open trial without counting it either way (the call failed before reaching the dependency)."""
+        with self.lock:
+            self.trial_running = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+
+breakers = {name: CircuitBreaker(name) for name in ["gemini", "chroma", "postgres"]}
+
+
+# (module, exception names) that mean the dependency was unreachable or slow, not that the call was wrong;
+# modules that aren't installed are skipped
+TRANSIENT_ERRORS = [
+    ("httpx", ("TransportError",)),                       # connect/read/write/pool timeouts, network errors
+    ("openai", ("APIConnectionError", "APITimeoutError")),
+    ("requests", ("ConnectionError", "Timeout")),
+    ("sqlalchemy.exc", ("OperationalError", "DisconnectionError")),
+    ("psycopg2", ("OperationalError",)),
+    ("chromadb.errors", ("ChromaConnectionError",)),
+]
+
+
+def _transient_types():
+    types = [ConnectionError, TimeoutError, sqlite3.OperationalError]   # sqlite3: Chroma's "database is locked"
+    for module, names in TRANSIENT_ERRORS:
+        try:
+            mod = importlib.import_module(module)
+        except ImportError:
+            continue
+        types += [getattr(mod, n) for n in names if isinstance(getattr(mod, n, None), type)]
+    return tuple(types)
+
+
+TRANSIENT_TYPES = _transient_types()
+
+
+def status_of(e):
+    """HTTP status carried by an API error (openai: status_code, google-genai: code), else None."""
+    status = getattr(e, "status_code", None) or getattr(e, "code", None)
+    return status if isinstance(status, int) and 100 <= status < 600 else None
+
+
+def is_retryable(e):
+    """Timeouts, dropped connections, 408/429 and 5xx. Anything else (4xx, or a bug like TypeError) fails at once."""
+    status = status_of(e)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    return isinstance(e, TRANSIENT_TYPES)
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(STAGE_BACKOFF_MAX, STAGE_BACKOFF_BASE * (2 ** attempt)))
+
+
+def call_with_retry(dependency, func, *args, retries=STAGE_RETRIES, **kwargs):
+    """Run one pipeline stage with jittered retries behind the dependency's circuit breaker."""
+    breaker = breakers[dependency]
+    last_error = None
+
+    for attempt in range(retries):
+        if not breaker.allow():
+            raise DependencyUnavailable(dependency, f"{dependency} circuit is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                if status_of(e) is not None:
+                    # the dependency answered, the request itself was bad
+                    breaker.success()
+                else:
+                    # our own bug, says nothing about the dependency's health
+                    breaker.release()
+                raise
+            breaker.failure()
+            last_error = e
+            log.warning("attempt_failed", func=func.__name__, dependency=dependency, attempt=attempt + 1, error=str(e))
+            if attempt < retries - 1:
+                time.sleep(backoff_delay(attempt))
+            continue
+        breaker.success()
+        return result
+
+    raise DependencyUnavailable(dependency, f"{func.__name__} failed after {retries} attempts: {last_error}") from last_error
+
+
+def resilient(dependency):
+    """Decorator form of call_with_retry for stage functions."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            return call_with_retry(dependency, func, *args, **kwargs)
+        return inner
+    return wrap
+
+
+def breaker_states():
+    return {name: {"state": b.state, "failures": b.failures} for name, b in breakers.items()}
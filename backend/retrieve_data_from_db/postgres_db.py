@@ -1,36 +1,48 @@
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, InterfaceError
 import pandas as pd
+from resilience.retry import resilient
+from observability.tracing import span
+from observability.log import get_logger
 
 # Load .env
 load_dotenv()
 
+log = get_logger(__name__)
+
 # Get DB_URL from environment
 DB_URL = os.getenv("DB_URL")
 
 # Create SQLAlchemy engine
-engine = create_engine(DB_URL, connect_args={"connect_timeout": 30})
+# connect_timeout is a libpq option; the benchmark fixture runs on SQLite without it
+engine = create_engine(DB_URL, pool_pre_ping=True, connect_args={"connect_timeout": 30} if (DB_URL or "").startswith("postgres") else {})
 
+@resilient("postgres")
 def retrieve_data_from_postgres(sql_query: str) -> pd.DataFrame:
     """Execute a SQL query on Cloud SQL and return a pandas DataFrame."""
     try:
         # Clean the SQL query
         sql_query = sql_query.strip()
         if not sql_query:
-            print("Error: Empty SQL query")
+            log.error("empty_sql")
             return pd.DataFrame()
         
-        print(f"Executing SQL: {sql_query[:200]}...")  # Log first 200 chars
+        log.info("executing_sql", sql=sql_query)
         
-        with engine.connect() as conn:
+        with span("postgres_fetch") as s, engine.connect() as conn:
             # Use text() to properly handle the SQL query
             df = pd.read_sql(text(sql_query), conn)
+            s["rows"] = len(df)
         
-        print(f"Retrieved {len(df)} rows with columns: {df.columns.tolist()}")
+        log.info("rows_retrieved", rows=len(df), columns=df.columns.tolist())
         return df
+
+    except (OperationalError, InterfaceError):
+        # connection problems are retried by the stage wrapper, bad SQL is not
+        raise
         
     except Exception as e:
-        print(f"Error retrieving data from postgres: {e}")
-        print(f"Failed SQL query: {sql_query}")
+        log.error("sql_failed", error=str(e), sql=sql_query)
         return pd.DataFrame()
\ No newline at end of file
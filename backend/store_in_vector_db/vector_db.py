@@ -1,5 +1,8 @@
 import chromadb
-from google import genai
+from llm_client.router import embed_content
+from resilience.retry import resilient
+from observability.tracing import traced, span
+from observability.log import get_logger
 
 
 from dotenv import load_dotenv
@@ -7,10 +10,13 @@ import os
 
 
 load_dotenv()
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY2')
+
+log = get_logger(__name__)
+
 CHROMA_API_KEY = os.getenv('CHROMA_API_KEY')
 CHROMA_TENANT = os.getenv('CHROMA_TENANT')
 CHROMA_DB = os.getenv('CHROMA_DB')
+CHROMA_PATH = os.getenv('CHROMA_PATH', "/home/subhash/Desktop/float/subhash_chromadb")
 
 # chroma_client = chromadb.CloudClient(
 #     api_key=CHROMA_API_KEY,
@@ -18,18 +24,17 @@ CHROMA_DB = os.getenv('CHROMA_DB')
 #     database=CHROMA_DB
 # )
 
-chroma_client = chromadb.PersistentClient("/home/subhash/Desktop/float/subhash_chromadb")
+chroma_client = chromadb.PersistentClient(CHROMA_PATH)
 
 collection = chroma_client.get_or_create_collection(name="documents")
 
 
+@traced("embedding")
+@resilient("gemini")
 def generate_embeddings(summary):
 
-    client = genai.Client(
-        api_key=GEMINI_API_KEY
-    )
-
-    result = client.models.embed_content(
+    result = embed_content(
+            preferred_key="GEMINI_API_KEY2",
             model="gemini-embedding-001",
             contents=summary)
 
@@ -46,20 +51,42 @@ def add_documents(documents, metadata, embeddings, float_id):
         ids=[float_id]
     )
 
-    print(f"Data added successfully {float_id}", end="\n\n\n\n")
+    log.info("document_added", float_id=float_id)
+
+
+@resilient("chroma")
+def upsert_documents(documents, metadata, embeddings, float_id):
+    """add_documents for re-ingestion: replaces the float's document if it is already indexed."""
+    collection.upsert(
+        documents=[documents],
+        metadatas=[metadata],
+        embeddings=embeddings,
+        ids=[float_id]
+    )
+
+    log.info("document_upserted", float_id=float_id)
+
+
+@resilient("chroma")
+def query_collection(query_embeddings, filters):
+    with span("chroma_query") as s:
+        if(filters == {}):
+            results = collection.query(
+            query_embeddings=query_embeddings,
+            )
+        else:
+            results = collection.query(
+                query_embeddings=query_embeddings,
+                where=filters,
+                n_results=100
+            )
+        s["rows"] = len(results['ids'][0])
+    return results
 
 
 def query_documents(query, filters):
-    if(filters == {}):
-        results = collection.query(
-        query_embeddings=generate_embeddings(query),
-        )
-    else:
-        results = collection.query(
-            query_embeddings=generate_embeddings(query),
-            where=filters,
-            n_results=100
-        )
+    # embedding and chroma query retry separately, a chroma retry reuses the embedding
+    results = query_collection(generate_embeddings(query), filters)
     # print("\n",results, end="\n\n")
 
 
@@ -0,0 +1,197 @@
+import os
+import json
+import math
+import pandas as pd
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Rough chars-per-token ratio used for budgeting, close enough for Gemini on JSON text
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = int(os.getenv("FINAL_ANS_TOKEN_BUDGET", "6000"))
+# Rows serialized to estimate the size of the whole result before deciding to pass it raw
+SIZE_SAMPLE_ROWS = 20
+
+# Columns treated as the x-axis of a series (time or depth), in order of preference
+SERIES_COLUMNS = ["date", "obs_time", "month", "year", "day", "pres_adj_dbar", "pres_raw_dbar", "pres"]
+
+# Columns that make sense to group by when present
+GROUP_COLUMNS = ["float_id", "profile", "year", "month"]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for a prompt fragment."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _to_json(obj) -> str:
+    return json.dumps(obj, default=str, ensure_ascii=False)
+
+
+def _round(value, digits=4):
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, float):
+        return round(value, digits)
+    if hasattr(value, "item"):
+        value = value.item()
+        return round(value, digits) if isinstance(value, float) else value
+    return value
+
+
+def column_stats(df: pd.DataFrame, top_values=5) -> dict:
+    """Per-column stats: numeric summary, time range or most frequent values."""
+    stats = {}
+    for col in df.columns:
+        series = df[col]
+        entry = {"nulls": int(series.isna().sum())}
+
+        if pd.api.types.is_bool_dtype(series):
+            entry["true"] = int(series.sum())
+        elif pd.api.types.is_numeric_dtype(series):
+            desc = series.describe(percentiles=[0.25, 0.5, 0.75])
+            for key in ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]:
+                if key in desc:
+                    entry[key] = _round(desc[key])
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            entry["min"] = str(series.min())
+            entry["max"] = str(series.max())
+        else:
+            counts = series.astype(str).value_counts()
+            entry["unique"] = int(len(counts))
+            entry["top"] = {k: int(v) for k, v in counts.head(top_values).items()}
+
+        stats[col] = entry
+    return stats
+
+
+def group_aggregates(df: pd.DataFrame, max_groups=20) -> dict | None:
+    """Mean/min/max of numeric columns per group for the first useful grouping column."""
+    numeric_cols = df.select_dtypes("number").columns
+    for col in GROUP_COLUMNS:
+        if col not in df.columns:
+            continue
+        n_groups = df[col].nunique()
+        if n_groups < 2 or n_groups >= len(df):
+            continue
+
+        values = [c for c in numeric_cols if c != col]
+        if not values:
+            continue
+
+        grouped = df.groupby(col)[values].agg(["mean", "min", "max"])
+        grouped.columns = [f"{c}_{agg}" for c, agg in grouped.columns]
+        grouped["rows"] = df.groupby(col).size()
+        grouped = grouped.sort_values("rows", ascending=False).head(max_groups)
+
+        return {
+            "group_by": col,
+            "total_groups": int(n_groups),
+            "groups": [
+                {col: _round(idx), **{k: _round(v) for k, v in row.items()}}
+                for idx, row in grouped.iterrows()
+            ],
+        }
+    return None
+
+
+def downsampled_series(df: pd.DataFrame, max_points=50) -> dict | None:
+    """Evenly bin the numeric columns along the first time/depth column found."""
+    x_col = next((c for c in SERIES_COLUMNS if c in df.columns), None)
+    if x_col is None:
+        return None
+
+    values = [c for c in df.select_dtypes("number").columns if c != x_col and c not in GROUP_COLUMNS]
+    if not values:
+        return None
+
+    data = df[[x_col] + values].dropna(subset=[x_col]).sort_values(x_col)
+    if data.empty:
+        return None
+
+    if len(data) > max_points:
+        # Bin by position so every bin holds roughly the same number of rows
+        bins = pd.Series(range(len(data)), index=data.index) * max_points // len(data)
+        grouped = data.groupby(bins.values)
+        x_values = grouped[x_col].first()
+        data = grouped[values].mean()
+        data.insert(0, x_col, x_values)
+
+    return {
+        "x": x_col,
+        "points": int(len(data)),
+        "rows": [{k: _round(v) for k, v in row.items()} for row in data.to_dict(orient="records")],
+    }
+
+
+def top_rows(df: pd.DataFrame, k=10) -> list[dict]:
+    """First k rows, the SQL already ordered them by relevance when it matters."""
+    rows = df.head(k).to_dict(orient="records")
+    return [{c: _round(v) for c, v in row.items()} for row in rows]
+
+
+def summarize_dataframe(df: pd.DataFrame, token_budget=DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Turn a query result into a bounded JSON digest for the final LLM call.
+    Small results are passed through as raw records; larger ones are reduced to
+    per-column stats, group aggregates, top rows and a downsampled series, shrinking
+    each section until the digest fits the token budget.
+    """
+    if df is None or df.empty:
+        return "[]"
+
+    # Size the raw records from a few rows first; serializing a large result just to
+    # measure it would cost O(rows) on exactly the answers that end up digested
+    sample = df.head(SIZE_SAMPLE_ROWS).to_json(orient="records", date_format="iso")
+    if len(df) <= SIZE_SAMPLE_ROWS and estimate_tokens(sample) <= token_budget:
+        return sample
+    estimated_chars = len(sample) / min(len(df), SIZE_SAMPLE_ROWS) * len(df)
+    if len(df) > SIZE_SAMPLE_ROWS and math.ceil(estimated_chars / CHARS_PER_TOKEN) <= token_budget:
+        raw = df.to_json(orient="records", date_format="iso")
+        if estimate_tokens(raw) <= token_budget:
+            return raw
+
+    # Progressively smaller settings, the last one is close to stats only
+    levels = [
+        {"k": 20, "groups": 30, "points": 60, "top_values": 5},
+        {"k": 10, "groups": 15, "points": 30, "top_values": 5},
+        {"k": 5, "groups": 8, "points": 15, "top_values": 3},
+        {"k": 3, "groups": 0, "points": 0, "top_values": 1},
+    ]
+
+    digest = None
+    for level in levels:
+        digest = {
+            "note": f"Result has {len(df)} rows; this is a statistical digest of the full result, not a sample.",
+            "row_count": int(len(df)),
+            "columns": df.columns.tolist(),
+            "column_stats": column_stats(df, level["top_values"]),
+        }
+        if level["groups"]:
+            groups = group_aggregates(df, level["groups"])
+            if groups:
+                digest["group_aggregates"] = groups
+        if level["points"]:
+            series = downsampled_series(df, level["points"])
+            if series:
+                digest["series"] = series
+        digest["top_rows"] = top_rows(df, level["k"])
+
+        text = _to_json(digest)
+        if estimate_tokens(text) <= token_budget:
+            return text
+
+    # Very wide results can still overflow, keep the stats of the leading columns only
+    text = _to_json(digest)
+    while estimate_tokens(text) > token_budget and len(digest["column_stats"]) > 1:
+        keep = list(digest["column_stats"])[: max(1, len(digest["column_stats"]) // 2)]
+        digest["column_stats"] = {c: digest["column_stats"][c] for c in keep}
+        digest["top_rows"] = [{c: r.get(c) for c in keep} for r in digest["top_rows"]]
+        text = _to_json(digest)
+    return text